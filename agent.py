@@ -261,11 +261,11 @@ class Agent:
         if not keywords:
             return None
 
-        result_text = ""
+        parts = []
         tools_used = set()
         for msg in messages:
             if msg["role"] == "tool":
-                result_text += msg["content"].lower() + " "
+                parts.append(msg["content"])
                 try:
                     parsed = json.loads(msg["content"])
                     if isinstance(parsed, dict) and "tool" in parsed:
@@ -273,7 +273,8 @@ class Agent:
                 except (json.JSONDecodeError, TypeError):
                     pass
             elif msg["role"] == "assistant":
-                result_text += msg["content"].lower() + " "
+                parts.append(msg["content"])
+        result_text = " ".join(parts).lower()
 
         def _covered(kw: str, text: str) -> bool:
             """Check if keyword is covered in text, with basic stem matching."""
@@ -299,6 +300,13 @@ class Agent:
 
         return None
 
+    # Tool-call syntaxes, compiled once; _parse_tool_call tries them in order
+    _NATIVE_CALL_RE = re.compile(r'<\|tool_call_start\|>\[?(.*?)\]?<\|tool_call_end\|>', re.DOTALL)
+    _BRACKET_CALL_RE = re.compile(r'\[(\w+\(.*?\))\]', re.DOTALL)
+    _BARE_CALL_RE = re.compile(r'(' + '|'.join(sorted(_KNOWN_TOOLS)) + r')\(([^)]*)\)')
+    _CALL_RE = re.compile(r'(\w+)\((.*)\)', re.DOTALL)
+    _PARAM_RE = re.compile(r'(\w+)\s*=\s*(".*?"|\'.*?\'|\d+|None|True|False)')
+
     def _parse_tool_call(self, response: str) -> dict | None:
         """Parse tool call from model output.
 
@@ -308,11 +316,14 @@ class Agent:
         3. Bracket-wrapped: [tool_name(params)]
         4. Known tool call anywhere in response: tool_name(params)
         """
+        # Every supported format needs a "(" or a "{"; plain prose skips all parsers
+        if "(" not in response and "{" not in response:
+            return None
+
         # Try LFM2.5 native format (brackets inside special tokens)
-        tc_match = re.search(
-            r'<\|tool_call_start\|>\[?(.*?)\]?<\|tool_call_end\|>',
-            response,
-            re.DOTALL,
+        tc_match = (
+            self._NATIVE_CALL_RE.search(response)
+            if "<|tool_call_start|>" in response else None
         )
         if tc_match:
             result = self._parse_native_tool_call(tc_match.group(1))
@@ -322,8 +333,8 @@ class Agent:
                 return result
 
         # Try JSON format
-        parsed = parse_json(response, debug=self.debug)
-        if parsed and "name" in parsed:
+        parsed = parse_json(response, debug=self.debug) if "{" in response else None
+        if isinstance(parsed, dict) and "name" in parsed:
             if self.debug:
                 print(f"  [AGENT] Parse format: JSON")
             return {
@@ -332,7 +343,7 @@ class Agent:
             }
 
         # Try bracket-wrapped format: [tool_name(params)]
-        bracket_match = re.search(r'\[(\w+\(.*?\))\]', response, re.DOTALL)
+        bracket_match = self._BRACKET_CALL_RE.search(response) if "[" in response else None
         if bracket_match:
             result = self._parse_native_tool_call(bracket_match.group(1))
             if result:
@@ -341,10 +352,7 @@ class Agent:
                 return result
 
         # Try bare function call anywhere in response
-        bare_match = re.search(
-            r'(' + '|'.join(self._KNOWN_TOOLS) + r')\(([^)]*)\)',
-            response,
-        )
+        bare_match = self._BARE_CALL_RE.search(response) if "(" in response else None
         if bare_match:
             call_str = bare_match.group(0)
             result = self._parse_native_tool_call(call_str)
@@ -361,7 +369,7 @@ class Agent:
 
         Example: semantic_search(query="invoices", top_k=5)
         """
-        match = re.match(r'(\w+)\((.*)\)', raw.strip(), re.DOTALL)
+        match = Agent._CALL_RE.match(raw.strip())
         if not match:
             return None
 
@@ -369,10 +377,7 @@ class Agent:
         params_str = match.group(2)
 
         params = {}
-        for param_match in re.finditer(
-            r'(\w+)\s*=\s*(".*?"|\'.*?\'|\d+|None|True|False)',
-            params_str,
-        ):
+        for param_match in Agent._PARAM_RE.finditer(params_str):
             key = param_match.group(1)
             value = param_match.group(2).strip("\"'")
             if value == "None":
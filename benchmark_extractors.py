@@ -5,7 +5,9 @@ Usage: python benchmark_extractors.py --dir /path/to/documents
 from __future__ import annotations
 
 import argparse
-import time
+import math
+import statistics
+import timeit
 from pathlib import Path
 
 from file_reader import FileReader
@@ -13,6 +15,7 @@ from file_reader import FileReader
 
 BACKENDS = ("docling", "kreuzberg")
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".doc", ".pptx", ".xlsx", ".html", ".htm"}
+MIN_SAMPLE_TIME = 0.2  # seconds per timed sample, as in timeit.Timer.autorange
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -24,7 +27,7 @@ def build_parser() -> argparse.ArgumentParser:
         "--dir", required=True, help="Directory containing documents to benchmark"
     )
     parser.add_argument(
-        "--trials", type=int, default=3, help="Number of timed trials per file (default: 3)"
+        "--trials", type=int, default=3, help="Number of timed samples per file (default: 3)"
     )
     return parser
 
@@ -40,17 +43,21 @@ def _collect_files(directory: str) -> list[Path]:
 
 
 def run_benchmark(
-    directory: str, num_trials: int = 3
+    directory: str, num_trials: int = 3, min_sample_time: float = MIN_SAMPLE_TIME
 ) -> dict[str, list[dict]]:
     """Run benchmark on all supported files in directory with both backends.
 
-    For each backend:
-      1. Warmup: extract first file once (untimed)
-      2. Run num_trials timed extractions per file
-      3. Report mean time and output length per file
+    For each backend and file:
+      1. Warmup: extract the file once (untimed); its output is the one reported
+      2. Size each sample from a second, warm extraction to enough
+         back-to-back extractions to take at least min_sample_time, so fast
+         files are not lost in timer noise
+      3. Take num_trials samples and report min, median and mean time per
+         extraction (min and median are far less sensitive to one-off stalls)
 
     Returns dict mapping backend name to list of per-file result dicts.
-    Each result dict has: filename, mean_time, output_length (or error on failure).
+    Each result dict has: filename, mean_time, median_time, min_time,
+    output_length (or error on failure).
     """
     files = _collect_files(directory)
     results: dict[str, list[dict]] = {}
@@ -59,28 +66,29 @@ def run_benchmark(
         reader = FileReader.from_backend(backend)
         backend_results: list[dict] = []
 
-        # Warmup: run one extraction on first file (untimed)
-        if files:
-            try:
-                reader.read(str(files[0]))
-            except Exception:
-                pass  # warmup errors are ignored
-
-        # Timed trials
         for file_path in files:
+            path = str(file_path)
             try:
-                times: list[float] = []
-                output = ""
-                for _ in range(num_trials):
-                    start = time.perf_counter()
-                    output = reader.read(str(file_path))
-                    elapsed = time.perf_counter() - start
-                    times.append(elapsed)
-
-                mean_time = sum(times) / len(times)
+                output = reader.read(path)
+
+                # Size samples from a warm call: the warmup read may include the
+                # backend's one-off model load, which says nothing about later reads
+                timer = timeit.Timer(lambda: reader.read(path))
+                number = 1
+                if min_sample_time > 0:
+                    warm_call = timer.timeit(number=1)
+                    if warm_call <= 0:
+                        number, _ = timer.autorange()
+                    elif warm_call < min_sample_time:
+                        number = math.ceil(min_sample_time / warm_call)
+                samples = timer.repeat(repeat=num_trials, number=number)
+                per_call = [sample / number for sample in samples]
+
                 backend_results.append({
                     "filename": file_path.name,
-                    "mean_time": mean_time,
+                    "mean_time": statistics.fmean(per_call),
+                    "median_time": statistics.median(per_call),
+                    "min_time": min(per_call),
                     "output_length": len(output),
                 })
             except Exception as e:
@@ -97,7 +105,10 @@ def run_benchmark(
 def format_results(results: dict[str, list[dict]]) -> str:
     """Format benchmark results as a readable table."""
     lines: list[str] = []
-    header = f"{'File':<30} {'Backend':<12} {'Mean Time (s)':<15} {'Output Len':<12}"
+    header = (
+        f"{'File':<30} {'Backend':<12} {'Min Time (s)':<15} {'Median (s)':<15} "
+        f"{'Mean Time (s)':<15} {'Output Len':<12}"
+    )
     lines.append(header)
     lines.append("-" * len(header))
 
@@ -114,10 +125,12 @@ def format_results(results: dict[str, list[dict]]) -> str:
             if file_result is None:
                 continue
             if "error" in file_result:
-                lines.append(f"{filename:<30} {backend:<12} {'ERROR':<15} {file_result['error']}")
+                lines.append(f"{filename:<30} {backend:<12} {'ERROR':<15} {'':<15} {'':<15} {file_result['error']}")
             else:
                 lines.append(
-                    f"{filename:<30} {backend:<12} {file_result['mean_time']:<15.4f} {file_result['output_length']:<12}"
+                    f"{filename:<30} {backend:<12} {file_result['min_time']:<15.4f} "
+                    f"{file_result['median_time']:<15.4f} {file_result['mean_time']:<15.4f} "
+                    f"{file_result['output_length']:<12}"
                 )
 
     return "\n".join(lines)
@@ -153,8 +153,8 @@ def chat_loop(index_name: str, data_dir: str):
             conversation_history = conversation_history[-10:]
 
 
-def main():
-    args = sys.argv[1:]
+def main(argv: list[str] | None = None):
+    args = sys.argv[1:] if argv is None else list(argv)
 
     if "--reuse" in args:
         idx = args.index("--reuse")
@@ -1,9 +1,17 @@
 """FileReader — on-demand text extraction with pluggable backends."""
 from __future__ import annotations
 
+import threading
 from pathlib import Path
 from typing import Protocol, runtime_checkable
 
+# DocumentConverter loads its layout/OCR models on construction, so every
+# DoclingExtractor (one per indexed directory) shares a single instance.
+# Docling does not document the converter as thread-safe and requests run on
+# a worker pool, so the lock that guards creating it also serializes convert().
+_converter = None
+_converter_lock = threading.Lock()
+
 
 @runtime_checkable
 class TextExtractor(Protocol):
@@ -21,14 +29,19 @@ class DoclingExtractor:
     def extract(self, path: Path) -> str:
         """Convert a document to markdown text. Raises on failure."""
         converter = self._get_converter()
-        result = converter.convert(str(path))
+        with _converter_lock:
+            result = converter.convert(str(path))
         return result.document.export_to_markdown()
 
     def _get_converter(self):
-        """Lazy-load Docling converter on first use."""
+        """Lazy-load the shared Docling converter on first use."""
+        global _converter
         if self._converter is None:
-            from docling.document_converter import DocumentConverter
-            self._converter = DocumentConverter()
+            with _converter_lock:
+                if _converter is None:
+                    from docling.document_converter import DocumentConverter
+                    _converter = DocumentConverter()
+                self._converter = _converter
         return self._converter
 
 
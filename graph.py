@@ -6,6 +6,7 @@ and directory structure.
 """
 import json
 import re
+from collections import Counter
 from pathlib import Path, PurePosixPath
 
 import numpy as np
@@ -14,21 +15,22 @@ import numpy as np
 def build_nodes(passages: list[dict], base_dir: str) -> list[dict]:
     """Group passages by file_path and build node metadata."""
     base = Path(base_dir)
-    by_file: dict[str, list[dict]] = {}
-
-    for p in passages:
-        meta = p.get("metadata", {})
-        file_path = meta.get("file_path")
-        if not file_path:
-            continue
+    # Count passages per raw file_path first so the path arithmetic below
+    # runs once per file rather than once per passage
+    path_counts = Counter(p.get("metadata", {}).get("file_path") for p in passages)
+    path_counts.pop(None, None)
+    path_counts.pop("", None)
+
+    counts: dict[str, int] = {}
+    for file_path, n in path_counts.items():
         try:
             rel = str(PurePosixPath(Path(file_path).relative_to(base)))
         except ValueError:
             rel = PurePosixPath(file_path).name
-        by_file.setdefault(rel, []).append(p)
+        counts[rel] = counts.get(rel, 0) + n
 
     nodes = []
-    for rel_path, file_passages in by_file.items():
+    for rel_path, count in counts.items():
         pp = PurePosixPath(rel_path)
         nodes.append({
             "id": rel_path,
@@ -36,7 +38,7 @@ def build_nodes(passages: list[dict], base_dir: str) -> list[dict]:
             "type": pp.suffix.lstrip(".").lower() if pp.suffix else "",
             "size": 0,
             "dir": str(pp.parent) if str(pp.parent) != "." else "",
-            "passageCount": len(file_passages),
+            "passageCount": count,
         })
     return nodes
 
@@ -57,29 +59,35 @@ def compute_similarity_edges(
     norms = np.where(norms == 0, 1, norms)
     normalized = matrix / norms
     sim_matrix = normalized @ normalized.T
+    np.fill_diagonal(sim_matrix, -1)
+
+    # Each row's top_k neighbours, best first: partition out the k best in
+    # one vectorized call and sort only those, instead of a full sort per row
+    k = min(top_k, n)
+    if k < n:
+        top = np.argpartition(-sim_matrix, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(n), (n, 1))
+    top_scores = np.take_along_axis(sim_matrix, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
 
     edges = []
     seen = set()
 
-    for i in range(n):
-        scores = sim_matrix[i].copy()
-        scores[i] = -1
-        top_indices = np.argsort(scores)[::-1][:top_k]
-
-        for j in top_indices:
-            score = float(scores[j])
-            if score < threshold:
-                continue
-            pair = tuple(sorted((file_ids[i], file_ids[j])))
-            if pair in seen:
-                continue
-            seen.add(pair)
-            edges.append({
-                "source": file_ids[i],
-                "target": file_ids[j],
-                "type": "similarity",
-                "weight": round(score, 3),
-            })
+    for i, rank in zip(*np.nonzero(top_scores >= threshold)):
+        j = top[i, rank]
+        pair = tuple(sorted((file_ids[i], file_ids[j])))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        edges.append({
+            "source": file_ids[i],
+            "target": file_ids[j],
+            "type": "similarity",
+            "weight": round(float(top_scores[i, rank]), 3),
+        })
 
     return edges
 
@@ -140,9 +148,9 @@ def compute_reference_edges(
 ) -> list[dict]:
     """Detect references between files via shared entities and filename mentions."""
     # Phase 1: Extract entities per file
+    combined_by_file = {fid: " ".join(texts) for fid, texts in passages_by_file.items()}
     entities_by_file: dict[str, dict[str, set[str]]] = {}
-    for fid, texts in passages_by_file.items():
-        combined = " ".join(texts)
+    for fid, combined in combined_by_file.items():
         entities_by_file[fid] = extract_entities(combined)
 
     # Phase 2: Build inverted index — entity -> set of file IDs
@@ -179,13 +187,18 @@ def compute_reference_edges(
     for fid in file_ids:
         name = PurePosixPath(fid).name
         name_to_ids.setdefault(name, set()).add(fid)
+    # Case-insensitive literal search: lowercase each side once and use plain
+    # substring tests rather than an IGNORECASE regex per (file, name) pair
+    lowered_names = [
+        (name, name.lower(), target_ids)
+        for name, target_ids in name_to_ids.items()
+        if len(name) >= 4
+    ]
 
-    for source_id, texts in passages_by_file.items():
-        combined = " ".join(texts)
-        for name, target_ids in name_to_ids.items():
-            if len(name) < 4:
-                continue
-            if re.search(re.escape(name), combined, re.IGNORECASE):
+    for source_id, combined in combined_by_file.items():
+        lowered = combined.lower()
+        for name, lowered_name, target_ids in lowered_names:
+            if lowered_name in lowered:
                 for target_id in target_ids:
                     if target_id == source_id:
                         continue
@@ -210,23 +223,26 @@ def compute_structure_edges(file_ids: list[str]) -> tuple[list[dict], list[dict]
         Tuple of (edges, directory_nodes). Directory nodes are synthetic nodes
         representing folders, needed so the graph can display the tree structure.
     """
-    # Collect all directory paths
+    # Collect all directory paths. File ids are normalized relative POSIX
+    # paths (see build_nodes), so rpartition is enough to walk up the tree,
+    # and the walk can stop at the first ancestor already recorded.
     dirs = set()
     for fid in file_ids:
-        parts = PurePosixPath(fid).parts
-        for i in range(1, len(parts)):
-            dirs.add("/".join(parts[:i]))
+        parent = fid.rpartition("/")[0]
+        while parent and parent not in dirs:
+            dirs.add(parent)
+            parent = parent.rpartition("/")[0]
 
     # Create synthetic directory nodes
     dir_nodes = []
     for d in sorted(dirs):
-        pp = PurePosixPath(d)
+        parent, _, name = d.rpartition("/")
         dir_nodes.append({
             "id": d,
-            "name": pp.name + "/",
+            "name": name + "/",
             "type": "dir",
             "size": 0,
-            "dir": str(pp.parent) if str(pp.parent) != "." else "",
+            "dir": parent,
             "passageCount": 0,
         })
 
@@ -235,9 +251,8 @@ def compute_structure_edges(file_ids: list[str]) -> tuple[list[dict], list[dict]
 
     # File → parent directory edges
     for fid in file_ids:
-        pp = PurePosixPath(fid)
-        parent = str(pp.parent) if str(pp.parent) != "." else ""
-        if parent and parent in dirs:
+        parent = fid.rpartition("/")[0]
+        if parent:
             pair = (parent, fid)
             if pair not in seen:
                 seen.add(pair)
@@ -251,19 +266,15 @@ def compute_structure_edges(file_ids: list[str]) -> tuple[list[dict], list[dict]
 
     # Directory → parent directory edges
     for d in dirs:
-        pp = PurePosixPath(d)
-        parent = str(pp.parent) if str(pp.parent) != "." else ""
-        if parent and parent in dirs:
-            pair = (parent, d)
-            if pair not in seen:
-                seen.add(pair)
-                edges.append({
-                    "source": parent,
-                    "target": d,
-                    "type": "structure",
-                    "weight": 1.0,
-                    "label": "contains",
-                })
+        parent = d.rpartition("/")[0]
+        if parent:
+            edges.append({
+                "source": parent,
+                "target": d,
+                "type": "structure",
+                "weight": 1.0,
+                "label": "contains",
+            })
 
     # If no subdirectories exist (all files at root), connect all files to a
     # virtual root so the structure tab still shows something
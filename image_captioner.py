@@ -31,10 +31,17 @@ class ImageCaptioner:
         self.dir_id = dir_id
         self.debug = debug
 
-    def run(self) -> None:
+    def run(self) -> tuple[int, int]:
+        """Caption uncached images and inject them into the index.
+
+        Returns (injected, failed): the number of captions injected, so
+        callers only reload the index when it actually changed on disk, and
+        the number of uncached images that did not make it into the index,
+        so callers know whether a later run still has work to do.
+        """
         images = self._find_images()
         if not images:
-            return
+            return 0, 0
 
         # Separate cached from uncached
         uncached = []
@@ -75,7 +82,6 @@ class ImageCaptioner:
                             next_future = executor.submit(self._load_image_as_data_uri, uncached[i + 1])
 
                         caption = self.model.caption_image(data_uri)
-                        self.cache.put(str(img), caption)
                         new_captions.append((img, caption))
                         done += 1
                         if self.debug:
@@ -95,12 +101,20 @@ class ImageCaptioner:
                         continue
 
         # Only inject when there are new captions to add
+        injected = 0
+        failed = total - len(new_captions)
         if new_captions:
             try:
                 self._inject_captions(new_captions)
+                # Cache only what reached the index, so a failed injection is
+                # retried on the next run instead of being treated as done
+                for img, caption in new_captions:
+                    self.cache.put(str(img), caption)
+                injected = len(new_captions)
                 if self.debug:
                     print(f"[CAPTIONER] Injected {len(new_captions)} new captions into index")
             except Exception as exc:
+                failed = total
                 log.warning(f"Failed to inject captions into index: {exc}")
                 if self.debug:
                     print(f"[CAPTIONER] Failed to inject captions: {exc}")
@@ -116,6 +130,7 @@ class ImageCaptioner:
             "total": total,
             "state": "complete",
         })
+        return injected, failed
 
     def _find_images(self) -> list[Path]:
         images = []
@@ -1,4 +1,5 @@
 """ModelManager: text + vision GGUF models via llama-cpp-python."""
+import functools
 import json
 import os
 import sys
@@ -12,10 +13,15 @@ def _manifest_path() -> Path:
     return Path(__file__).parent / "models-manifest.json"
 
 
+@functools.lru_cache(maxsize=1)
+def _manifest_text() -> str:
+    """Read the manifest once; it ships with the code and never changes at runtime."""
+    return _manifest_path().read_text()
+
+
 def load_manifest() -> dict:
-    """Load and return the models manifest as a dict."""
-    with open(_manifest_path()) as f:
-        return json.load(f)
+    """Load and return the models manifest as a dict (a fresh copy per call)."""
+    return json.loads(_manifest_text())
 
 
 def get_models_dir() -> Path:
@@ -2,6 +2,17 @@
 import json
 import re
 
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install manole[fast]
+    orjson = None
+
+# Direct parse is the common case (the model usually replies with bare JSON)
+_json_loads = orjson.loads if orjson is not None else json.loads
+_DECODER = json.JSONDecoder()
+_RELEVANT_RE = re.compile(r'"relevant"\s*:\s*(true|false)', re.IGNORECASE)
+_FACTS_RE = re.compile(r'"facts"\s*:\s*\[([^\]]*)\]')
+
 
 def parse_json(text: str, debug: bool = False) -> dict | None:
     """Parse JSON from LLM output with fallback regex extraction.
@@ -13,34 +24,30 @@ def parse_json(text: str, debug: bool = False) -> dict | None:
     """
     # Try direct parse
     try:
-        result = json.loads(text.strip())
+        result = _json_loads(text.strip())
         if debug:
             print("  [PARSER] Strategy: direct JSON parse")
         return result
-    except (json.JSONDecodeError, ValueError):
+    except ValueError:  # includes json/orjson JSONDecodeError
         pass
 
-    # Try each { as a potential JSON start, parse greedily from there
-    for i, ch in enumerate(text):
-        if ch == '{':
-            # Find the last } after this position
-            last_brace = text.rfind('}', i)
-            while last_brace > i:
-                try:
-                    result = json.loads(text[i:last_brace + 1])
-                    if debug:
-                        print(f"  [PARSER] Strategy: brace extraction at pos {i}")
-                    return result
-                except (json.JSONDecodeError, ValueError):
-                    # Shrink: try the next } inward
-                    last_brace = text.rfind('}', i, last_brace)
-            break  # only try the first { — that's where the real JSON is
+    # Decode the object starting at the first { in place; raw_decode stops at
+    # its closing brace, so trailing text needs no trial slicing
+    start = text.find('{')
+    if start != -1:
+        try:
+            result, _ = _DECODER.raw_decode(text, start)
+            if debug:
+                print(f"  [PARSER] Strategy: brace extraction at pos {start}")
+            return result
+        except (json.JSONDecodeError, ValueError):
+            pass  # only try the first { — that's where the real JSON is
 
     # Fallback: extract "relevant" field via regex
-    rel_match = re.search(r'"relevant"\s*:\s*(true|false)', text, re.IGNORECASE)
+    rel_match = _RELEVANT_RE.search(text)
     if rel_match:
         relevant = rel_match.group(1).lower() == "true"
-        facts_match = re.search(r'"facts"\s*:\s*\[([^\]]*)\]', text)
+        facts_match = _FACTS_RE.search(text)
         facts = []
         if facts_match:
             facts = [f.strip().strip('"') for f in facts_match.group(1).split(",") if f.strip()]
@@ -1,4 +1,6 @@
 """Searcher — vector search with internal map-filter."""
+from collections import OrderedDict
+
 from parser import parse_json
 
 MAP_SYSTEM = (
@@ -17,6 +19,8 @@ MAP_SYSTEM = (
 )
 
 MAX_FACTS_PER_CHUNK = 10
+RESULT_CACHE_SIZE = 32
+MIN_PRODUCTIVE_CHUNKS = 2
 
 _STOPWORDS = frozenset({
     "a", "an", "the", "is", "was", "are", "were", "be", "been",
@@ -49,14 +53,43 @@ class Searcher:
         self.file_reader = file_reader
         self.toolbox = toolbox
         self.debug = debug
+        # (normalized query, top_k) -> result; dropped when self.leann is swapped
+        self._results: OrderedDict[tuple[str, int], tuple[str, list[str]]] = OrderedDict()
+        self._results_leann = leann_searcher
 
     def search_and_extract(self, query: str, top_k: int = 5) -> tuple[str, list[str]]:
-        """Search + map-filter in one call. Returns (formatted facts string, source filenames)."""
+        """Search + map-filter in one call. Returns (formatted facts string, source filenames).
+
+        Results are memoized per index: repeating a query (modulo case and
+        whitespace) skips the vector search and every map-step LLM call.
+        Only answers built from map-step facts are kept; empty searches, "none
+        were relevant" and the filename fallback (which reads live files) are
+        recomputed every time, so a retry can still succeed.
+        """
+        if self._results_leann is not self.leann:
+            self._results.clear()
+            self._results_leann = self.leann
+        key = (" ".join(query.lower().split()), top_k)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            if self.debug:
+                print(f"  [SEARCH] Cache hit for query={query!r}")
+            return (cached[0], list(cached[1]))
+        text, sources, from_facts = self._search_and_extract(query, top_k)
+        if from_facts:
+            self._results[key] = (text, list(sources))
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return (text, sources)
+
+    def _search_and_extract(self, query: str, top_k: int) -> tuple[str, list[str], bool]:
+        """Uncached search_and_extract; the flag is True when the answer came from map-step facts."""
         chunks = self.leann.search(query, top_k=top_k)
         if self.debug:
             print(f"  [SEARCH] Vector search: {len(chunks)} chunks for query={query!r}")
         if not chunks:
-            return ("No matching content found.", [])
+            return ("No matching content found.", [], False)
 
         # Score pre-filter: drop chunks well below the top score
         if len(chunks) > 1:
@@ -69,12 +102,24 @@ class Searcher:
         # Map: extract facts per chunk
         # Trust vector search scores for relevance — the model's job is fact extraction.
         # The 1.2B model often misjudges relevance but still extracts useful facts.
+        # Stop early once enough chunks have yielded facts that mention every keyword.
         facts_by_source = {}
-        for chunk in chunks:
+        keywords = extract_keywords(query)
+        missing = set(keywords)
+        productive = 0
+        for i, chunk in enumerate(chunks):
             extracted = self._extract_facts(query, chunk)
             if extracted["facts"]:
                 source = self._get_source(chunk)
                 facts_by_source.setdefault(source, []).extend(extracted["facts"])
+                productive += 1
+                if missing:
+                    text = " ".join(extracted["facts"]).lower()
+                    missing = {kw for kw in missing if kw not in text}
+                if keywords and not missing and productive >= MIN_PRODUCTIVE_CHUNKS:
+                    if self.debug and i + 1 < len(chunks):
+                        print(f"  [SEARCH] Keywords covered, skipping {len(chunks) - i - 1} chunks")
+                    break
 
         if self.debug:
             total_facts = sum(len(f) for f in facts_by_source.values())
@@ -83,8 +128,8 @@ class Searcher:
             if self.debug:
                 print("  [SEARCH] No facts extracted, triggering filename fallback")
             if self.file_reader and self.toolbox:
-                return self._filename_fallback(query)
-            return ("Search returned results but none were relevant to the query.", [])
+                return (*self._filename_fallback(query), False)
+            return ("Search returned results but none were relevant to the query.", [], False)
 
         # Format for agent context
         lines = []
@@ -93,7 +138,7 @@ class Searcher:
             for fact in facts:
                 lines.append(f"  - {fact}")
         sources = list(facts_by_source.keys())
-        return ("\n".join(lines), sources)
+        return ("\n".join(lines), sources, True)
 
     def _extract_facts(self, query: str, chunk) -> dict:
         """Ask the model if this chunk is relevant and extract facts."""
@@ -8,20 +8,58 @@ Protocol:
     Request:  {"id": int, "method": str, "params": dict}
     Response: {"id": int|null, "type": str, "data": dict}
 """
+import heapq
 import json
 import os
+import re
 import sys
 import time
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, repeat
 from pathlib import Path
 
-from graph import build_file_graph
 from models import load_manifest, get_models_dir
-from huggingface_hub import hf_hub_download
+
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install manole[fast]
+    orjson = None
+
+
+# Extensions picked up by ImageCaptioner; kept here so the stats walk can
+# fingerprint images without importing the captioner (and LEANN) eagerly.
+_IMAGE_EXTS = frozenset({
+    "jpg", "jpeg", "png", "gif", "webp", "heic", "heif", "bmp", "tiff", "tif",
+})
+
+# Seconds a list_indexes result is reused before rescanning the index dirs
+_INDEXES_CACHE_TTL = 2.0
+
+# Directories a searchAll query works on at once; generation is serialized
+# by the model anyway, so more workers would only pile up waiting threads
+_QUERY_ALL_WORKERS = 4
+
+# Cheap methods answered on the reader thread, so they never queue behind
+# work on a pool
+_INLINE_METHODS = frozenset({"ping", "toggle_debug", "list_indexes"})
+
+# Methods that rebuild or delete an index. They run one at a time on their
+# own worker, so a burst of them (the UI re-inits every saved directory on
+# startup) cannot occupy the request pool while waiting on each other.
+_INDEX_METHODS = frozenset({"init", "reindex", "remove_directory"})
+
+# Per-directory conversation memory: the last 5 user/assistant exchanges
+_HISTORY_MAX_MESSAGES = 10
+
+
+_DIR_ID_TRANSLATE = str.maketrans({" ": "_", "/": "_"})
 
 
 def make_dir_id(path: str) -> str:
     """Derive a stable directory ID from an absolute path."""
-    return Path(path).name.replace(" ", "_").replace("/", "_")
+    return os.path.basename(os.path.normpath(path)).translate(_DIR_ID_TRANSLATE)
 
 
 # Directories that should never be indexed
@@ -34,24 +72,50 @@ _SENSITIVE_HOME_DIRS = {
 }
 
 
+def _sensitive_prefixes() -> tuple[str, ...]:
+    """Return absolute sensitive paths, both as written and symlink-resolved."""
+    home = Path.home()
+    paths = [Path(d) for d in _SENSITIVE_DIRS] + [home / d for d in _SENSITIVE_HOME_DIRS]
+    return tuple(dict.fromkeys(
+        s for p in paths for s in (str(p), str(p.resolve()))
+    ))
+
+
+def _compile_sensitive(paths) -> re.Pattern:
+    """Build one anchored regex matching any of paths or anything below them."""
+    alternation = "|".join(re.escape(p) for p in sorted(paths, key=len, reverse=True))
+    return re.compile(rf"(?:{alternation})(?:{re.escape(os.sep)}|\Z)")
+
+
+# Compiled once at import: a single C-level match replaces a Python loop
+# over prefixes, and the anchor rejects unrelated paths at the first char.
+_SENSITIVE_RE = _compile_sensitive(_sensitive_prefixes())
+
+
 def _is_sensitive_directory(path: Path) -> bool:
     """Return True if path points to a known sensitive system/user directory."""
-    path_str = str(path)
-    for d in _SENSITIVE_DIRS:
-        if path_str == d or path_str.startswith(d + "/"):
-            return True
-    home = Path.home()
-    for d in _SENSITIVE_HOME_DIRS:
-        sensitive = home / d
-        if path_str == str(sensitive) or path_str.startswith(str(sensitive) + "/"):
-            return True
-    return False
+    return _SENSITIVE_RE.match(str(path)) is not None
+
+
+# Every request and every streamed token goes through these; orjson is a
+# native encoder/decoder several times faster than stdlib json when present.
+if orjson is not None:
+    _json_loads = orjson.loads
 
+    def _json_dumpb(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+else:
+    _json_loads = json.loads
 
-def parse_request(line: str) -> dict | None:
+    def _json_dumpb(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+
+def parse_request(line: str | bytes) -> dict | None:
+    # Both decoders take bytes, so stdin can be read without a text layer
     try:
-        req = json.loads(line.strip())
-    except (json.JSONDecodeError, ValueError):
+        req = _json_loads(line)
+    except ValueError:  # includes json/orjson JSONDecodeError
         return None
     if not isinstance(req, dict) or "method" not in req:
         return None
@@ -59,27 +123,134 @@ def parse_request(line: str) -> dict | None:
 
 
 def format_response(req_id, resp_type: str, data: dict) -> str:
-    return json.dumps({"id": req_id, "type": resp_type, "data": data})
+    return _json_dumpb({"id": req_id, "type": resp_type, "data": data}).decode()
+
+
+# Envelope for plain streamed tokens; only the text needs a real encoder
+_TOKEN_LINE = b'{"id":%d,"type":"token","data":{"text":%b}}\n'
+
+
+def encode_response(req_id, resp_type: str, data: dict) -> bytes:
+    """Serialize a response as one newline-terminated NDJSON line."""
+    if resp_type == "token" and type(req_id) is int and len(data) == 1:
+        text = data.get("text")
+        if type(text) is str:
+            return _TOKEN_LINE % (req_id, _json_dumpb(text))
+    return _json_dumpb({"id": req_id, "type": resp_type, "data": data}) + b"\n"
 
 
 import threading
 
 _send_lock = threading.Lock()
 
+# Binary stream for protocol lines. The __main__ block points this at a dup
+# of the real stdout fd; when unset, sys.stdout's buffer is used.
+_protocol_out = None
+
 
 _debug_protocol = os.environ.get("MANOLE_DEBUG", "0") == "1"
 
+# Streamed tokens are left in the output buffer and flushed together once
+# _TOKEN_FLUSH_BYTES have piled up or _TOKEN_FLUSH_INTERVAL has passed since
+# the last flush. Any other message flushes at once, so a result or
+# agent_step never overtakes buffered tokens. The next message may be seconds
+# away (a tool run, the next prefill), so one long-lived flusher thread
+# writes out whatever is still buffered once the interval is up. All of this
+# state is guarded by _send_lock, which _send_cond wraps.
+_TOKEN_FLUSH_BYTES = 4096
+_TOKEN_FLUSH_INTERVAL = 0.016
+_pending_bytes = 0
+_last_flush = 0.0
+_pending_out = None  # stream holding unflushed tokens, if any
+_flusher: threading.Thread | None = None
+_send_cond = threading.Condition(_send_lock)
+
+
+def _flush_locked(out) -> None:
+    """Flush out and reset the token buffer state; caller holds _send_lock."""
+    global _pending_bytes, _last_flush, _pending_out
+    out.flush()
+    _pending_bytes = 0
+    _last_flush = time.monotonic()
+    _pending_out = None
+
+
+def _flush_loop() -> None:
+    """Flusher thread: flush buffered tokens once they are an interval old."""
+    with _send_cond:
+        while True:
+            if _pending_out is None:
+                _send_cond.wait()
+                continue
+            remaining = _last_flush + _TOKEN_FLUSH_INTERVAL - time.monotonic()
+            if remaining > 0:
+                _send_cond.wait(remaining)
+                continue
+            _flush_locked(_pending_out)
+
 
 def send(req_id, resp_type: str, data: dict):
     """Write a single NDJSON line to stdout (thread-safe)."""
-    line = format_response(req_id, resp_type, data)
+    line = encode_response(req_id, resp_type, data)
     if _debug_protocol:
-        import sys as _sys
         _data_preview = str(data)[:120]
-        _sys.stderr.write(f"  [SEND] id={req_id} type={resp_type} data={_data_preview}\n")
-        _sys.stderr.flush()
+        sys.stderr.write(f"  [SEND] id={req_id} type={resp_type} data={_data_preview}\n")
+        sys.stderr.flush()
+    global _pending_bytes, _pending_out, _flusher
+    out = _protocol_out if _protocol_out is not None else sys.stdout.buffer
     with _send_lock:
-        print(line, flush=True)
+        out.write(line)
+        _pending_bytes += len(line)
+        if (resp_type != "token" or _pending_bytes >= _TOKEN_FLUSH_BYTES
+                or time.monotonic() - _last_flush >= _TOKEN_FLUSH_INTERVAL):
+            _flush_locked(out)
+        elif _pending_out is None:
+            # First token of a new window: hand it to the flusher
+            _pending_out = out
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name="token-flusher", daemon=True)
+                _flusher.start()
+            _send_cond.notify()
+
+
+class _OrderedTokenRelay:
+    """Streams a searchAll query's tokens one directory at a time, in order.
+
+    Tokens from the first unfinished directory are sent as they arrive; the
+    others are held until every directory before them has finished.
+    """
+
+    def __init__(self, req_id, dir_ids: list[str]):
+        self.req_id = req_id
+        self.dir_ids = dir_ids
+        self.held: list[list[str]] = [[] for _ in dir_ids]
+        self.done = [False] * len(dir_ids)
+        self.live = 0
+        self.lock = threading.Lock()
+
+    def on_token(self, i: int):
+        """Return the on_token callback for the i-th directory."""
+        def on_token(text):
+            with self.lock:
+                if i == self.live:
+                    self._send(i, text)
+                else:
+                    self.held[i].append(text)
+        return on_token
+
+    def finish(self, i: int) -> None:
+        """Mark directory i finished and release whoever streams next."""
+        with self.lock:
+            self.done[i] = True
+            while self.live < len(self.dir_ids) and self.done[self.live]:
+                self.live += 1
+                if self.live < len(self.dir_ids):
+                    for text in self.held[self.live]:
+                        self._send(self.live, text)
+                    self.held[self.live].clear()
+
+    def _send(self, i: int, text: str) -> None:
+        send(self.req_id, "token", {"text": text, "directoryId": self.dir_ids[i]})
 
 
 class Server:
@@ -95,24 +266,63 @@ class Server:
         self.model = None
         self.rewriter = None
 
-        # Per-directory state
+        # Per-directory state. _dirs_lock guards mutation and iteration now
+        # that requests are serviced concurrently; _init_lock serializes
+        # inits, reindexes and removals, which share the model and rewriter
+        # and rewrite index files. Work on one directory's index and history
+        # (init, query, file graph, reindex, remove) is serialized by that
+        # directory's lock in _dir_locks, always taken after _init_lock.
         self.directories: dict[str, dict] = {}
+        self._dirs_lock = threading.RLock()
+        self._init_lock = threading.Lock()
+        self._dir_locks: dict[str, threading.Lock] = {}
+
+        # Queries and other long requests run here; index-changing methods
+        # get their own single worker (see _INDEX_METHODS) so they never
+        # park pool workers on _init_lock
+        self._pool = ThreadPoolExecutor(max_workers=4)
+        self._index_pool = ThreadPoolExecutor(max_workers=1)
+
+        # Index path -> (index fingerprint, warmed LeannSearcher), so
+        # re-opening a folder whose index is unchanged skips the warmup
+        self._leann_searchers: dict[str, tuple] = {}
+
+        # (monotonic timestamp, names) of the last list_indexes scan; reset
+        # whenever an index is built or deleted
+        self._indexes_cache: tuple[float, list[str]] = (float("-inf"), [])
+
+        # Method -> bound handler, all called as handler(req_id, params);
+        # built once rather than as a dict of fresh closures on every request
+        self._handlers = {
+            "ping": self.handle_ping,
+            "init": self.handle_init,
+            "query": self.handle_query,
+            "toggle_debug": self.handle_toggle_debug,
+            "list_indexes": self.handle_list_indexes,
+            "shutdown": self.handle_shutdown,
+            "remove_directory": self.handle_remove_directory,
+            "reindex": self.handle_reindex,
+            "getFileGraph": self.handle_get_file_graph,
+            "check_models": self.handle_check_models,
+            "download_models": self.handle_download_models,
+        }
 
     def _log(self, message: str):
         """Send a log message to the UI via stderr."""
-        import sys as _sys
-        _sys.stderr.write(message + "\n")
-        _sys.stderr.flush()
+        sys.stderr.write(message + "\n")
+        sys.stderr.flush()
 
     def _delete_index_files(self, entry: dict) -> None:
         """Delete the LEANN index directory and .neurofind cache from disk."""
         import shutil
         from chat import find_index_path
         index_name = entry.get("index_name")
+        self._indexes_cache = (float("-inf"), [])
+        self._leann_searchers.pop(entry.get("index_path"), None)
         if index_name:
             try:
-                index_path = find_index_path(index_name)
-                # find_index_path returns a file path like .leann/indexes/name/documents.leann
+                index_path = entry.get("index_path") or find_index_path(index_name)
+                # The index path is a file path like .leann/indexes/name/documents.leann
                 # We need to delete the parent directory containing all index files
                 index_dir = Path(index_path).parent
                 if index_dir.is_dir():
@@ -127,49 +337,209 @@ class Server:
                 shutil.rmtree(neurofind_dir)
                 self._log(f"Deleted cache: {neurofind_dir}")
 
-    def _collect_stats(self, data_dir: Path) -> dict:
-        """Walk a directory and return file statistics."""
-        file_count = 0
-        total_size = 0
-        types: dict[str, int] = {}
-        size_by_type: dict[str, int] = {}
-        largest_files: list[dict] = []
-        dir_count = 0
-        max_depth = 0
-
-        base_depth = len(data_dir.parts)
-        for p in data_dir.rglob("*"):
-            if p.is_symlink():
-                continue
-            if p.is_dir():
-                dir_count += 1
-                depth = len(p.parts) - base_depth
-                if depth > max_depth:
-                    max_depth = depth
+    @staticmethod
+    def _scan_subtree(root: str, depth: int, descend: bool = True) -> dict:
+        """Scan root and everything below it with os.scandir; return partial stats.
+
+        depth is the depth of root's direct children. With descend=False,
+        subdirectories are counted and returned in "subdirs" instead of walked.
+        """
+        part = {
+            "file_count": 0, "total_size": 0, "types": Counter(), "size_by_type": Counter(),
+            "largest": [],  # min-heap of the 3 biggest (size, name)
+            "dir_count": 0, "max_depth": 0, "subdirs": [],
+            "names": {},  # basename -> absolute paths, for source resolution
+            # Image fingerprint: count, newest mtime (ns), xor of path crc32s
+            "image_count": 0, "image_mtime": 0, "image_crc": 0,
+        }
+        types = part["types"]
+        size_by_type = part["size_by_type"]
+        largest = part["largest"]
+        names = part["names"]
+        subdirs = part["subdirs"]
+        # Hot-loop counters and callables live in locals and are written back
+        # to part once at the end
+        file_count = total_size = dir_count = max_depth = 0
+        image_count = image_mtime = image_crc = 0
+        heappush, heappushpop = heapq.heappush, heapq.heappushpop
+        crc32, fsencode, image_exts = zlib.crc32, os.fsencode, _IMAGE_EXTS
+
+        # Explicit stack rather than recursion: no recursion limit on deep
+        # trees, and each scandir handle is closed before its children are
+        # opened. DirEntry caches d_type (and stat on some platforms), so
+        # this avoids the per-entry Path allocation and stat() calls of rglob.
+        # With follow_symlinks=False, symlinks are neither dirs nor files and
+        # fall through both checks.
+        stack = [(root, depth)]
+        while stack:
+            dirpath, depth = stack.pop()
+            try:
+                it = os.scandir(dirpath)
+            except OSError:
                 continue
-            if p.is_file():
-                file_size = p.stat().st_size
-                file_count += 1
-                total_size += file_size
-                ext = p.suffix.lstrip(".").lower()
-                if ext:
-                    types[ext] = types.get(ext, 0) + 1
-                    size_by_type[ext] = size_by_type.get(ext, 0) + file_size
-                largest_files.append({"name": p.name, "size": file_size})
-
-        largest_files.sort(key=lambda f: f["size"], reverse=True)
-        largest_files = largest_files[:3]
+            with it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        dir_count += 1
+                        if depth > max_depth:
+                            max_depth = depth
+                        if descend:
+                            stack.append((e.path, depth + 1))
+                        else:
+                            subdirs.append(e.path)
+                        continue
+                    if not e.is_file(follow_symlinks=False):
+                        continue
+                    st = e.stat(follow_symlinks=False)
+                    file_size = st.st_size
+                    file_count += 1
+                    total_size += file_size
+                    name = e.name
+                    path = e.path
+                    paths = names.get(name)
+                    if paths is None:
+                        names[name] = [path]
+                    else:
+                        paths.append(path)
+                    dot = name.rfind(".")
+                    if dot > 0 and dot < len(name) - 1:
+                        ext = name[dot + 1:].lower()
+                        types[ext] += 1
+                        size_by_type[ext] += file_size
+                        if ext in image_exts:
+                            image_count += 1
+                            if st.st_mtime_ns > image_mtime:
+                                image_mtime = st.st_mtime_ns
+                            image_crc ^= crc32(fsencode(path))
+                    if len(largest) < 3:
+                        heappush(largest, (file_size, name))
+                    elif file_size >= largest[0][0]:
+                        heappushpop(largest, (file_size, name))
+
+        part.update(
+            file_count=file_count, total_size=total_size,
+            dir_count=dir_count, max_depth=max_depth,
+            image_count=image_count, image_mtime=image_mtime, image_crc=image_crc,
+        )
+        return part
+
+    def _walk_directory(self, data_dir: Path | str) -> dict:
+        """Walk a directory once and return the merged raw scan results.
+
+        Top-level files are counted inline; each top-level subdirectory is
+        walked on a thread pool since the scan is bound on syscalls, not CPU.
+        """
+        walk = self._scan_subtree(str(data_dir), 1, descend=False)
+        subdirs = walk["subdirs"]
+        if subdirs:
+            workers = min(32, (os.cpu_count() or 1) * 4, len(subdirs))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(self._scan_subtree, subdirs, repeat(2)))
+            names = walk["names"]
+            for part in parts:
+                walk["file_count"] += part["file_count"]
+                walk["total_size"] += part["total_size"]
+                walk["dir_count"] += part["dir_count"]
+                walk["max_depth"] = max(walk["max_depth"], part["max_depth"])
+                walk["types"].update(part["types"])
+                walk["size_by_type"].update(part["size_by_type"])
+                walk["image_count"] += part["image_count"]
+                walk["image_mtime"] = max(walk["image_mtime"], part["image_mtime"])
+                walk["image_crc"] ^= part["image_crc"]
+                for name, paths in part["names"].items():
+                    names.setdefault(name, []).extend(paths)
+            walk["largest"] = heapq.nlargest(
+                3, chain(walk["largest"], *(p["largest"] for p in parts)),
+            )
+        return walk
+
+    @staticmethod
+    def _stats_from_walk(walk: dict) -> dict:
+        """Shape raw walk results into the stats payload sent to the UI."""
+        file_count = walk["file_count"]
+        total_size = walk["total_size"]
+        largest_files = [
+            {"name": name, "size": size}
+            for size, name in sorted(walk["largest"], reverse=True)
+        ]
 
         return {
             "fileCount": file_count,
             "totalSize": total_size,
-            "types": types,
-            "sizeByType": size_by_type,
+            "types": dict(walk["types"]),
+            "sizeByType": dict(walk["size_by_type"]),
             "largestFiles": largest_files,
             "avgFileSize": total_size // file_count if file_count else 0,
-            "dirs": {"count": dir_count, "maxDepth": max_depth},
+            "dirs": {"count": walk["dir_count"], "maxDepth": walk["max_depth"]},
         }
 
+    @staticmethod
+    def _image_fingerprint(walk: dict) -> list[int]:
+        """Fingerprint of the images seen by a walk, for skipping captioning."""
+        return [walk["image_count"], walk["image_mtime"], walk["image_crc"]]
+
+    @staticmethod
+    def _index_fingerprint(index_path: str) -> list[list] | None:
+        """Sorted [name, size, mtime_ns] of the index files, or None if unreadable."""
+        fingerprint = []
+        try:
+            with os.scandir(Path(index_path).parent) as it:
+                for e in it:
+                    if e.is_file():
+                        st = e.stat()
+                        fingerprint.append([e.name, st.st_size, st.st_mtime_ns])
+        except OSError:
+            return None
+        return sorted(fingerprint)
+
+    @staticmethod
+    def _load_index_cache(path: Path, fingerprint: list[list] | None):
+        """Return the value cached at path if it was stored for fingerprint, else None."""
+        if fingerprint is None:
+            return None
+        try:
+            cached = _json_loads(path.read_bytes())
+            if cached.get("fingerprint") == fingerprint:
+                return cached["value"]
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+        return None
+
+    def _store_index_cache(self, path: Path, fingerprint: list[list] | None, value) -> None:
+        """Persist value at path, tagged with the index fingerprint it was derived from."""
+        if fingerprint is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(_json_dumpb({"fingerprint": fingerprint, "value": value}))
+        except OSError as exc:
+            self._log(f"Failed to write {path.name}: {exc}")
+
+    def _collect_stats(self, data_dir: Path) -> dict:
+        """Walk a directory and return file statistics."""
+        return self._stats_from_walk(self._walk_directory(data_dir))
+
+    def _resolve_sources(self, entry: dict, sources: list[str]) -> list[str]:
+        """Resolve source filenames to absolute paths under the entry's directory.
+
+        Names not directly under the directory are looked up in the basename
+        index built by the init walk (built lazily if the entry has none).
+        Unresolvable names are returned unchanged.
+        """
+        base_dir = entry["path"]
+        index = entry.get("basename_index")
+        resolved = []
+        for s in sources:
+            full = os.path.join(base_dir, s)
+            if os.path.exists(full):
+                resolved.append(full)
+                continue
+            if index is None:
+                index = entry["basename_index"] = self._walk_directory(base_dir)["names"]
+            candidates = index.get(s)
+            resolved.append(candidates[0] if candidates else s)
+        return resolved
+
     def _generate_summary(self, dir_id: str) -> str:
         """Query the index to generate a content-aware summary."""
         if not self.model:
@@ -191,16 +561,18 @@ class Server:
         result = self.model.generate(messages)
         return (result or "").strip()
 
-    def handle_ping(self, req_id) -> dict:
+    def handle_ping(self, req_id, params: dict | None = None) -> dict:
         data = {
             "state": self.state,
             "uptime": round(time.time() - self.start_time, 1),
         }
         return {"id": req_id, "type": "result", "data": data}
 
-    def handle_toggle_debug(self, req_id) -> dict:
+    def handle_toggle_debug(self, req_id, params: dict | None = None) -> dict:
         self.debug = not self.debug
-        for entry in self.directories.values():
+        with self._dirs_lock:
+            entries = list(self.directories.values())
+        for entry in entries:
             if "agent" in entry:
                 entry["agent"].debug = self.debug
                 entry["agent"].tools.debug = self.debug
@@ -212,12 +584,38 @@ class Server:
             self.rewriter.debug = self.debug
         return {"id": req_id, "type": "result", "data": {"debug": self.debug}}
 
-    def handle_shutdown(self, req_id) -> dict:
+    def handle_shutdown(self, req_id, params: dict | None = None) -> dict:
         self.running = False
         return {"id": req_id, "type": "result", "data": {"status": "shutting_down"}}
 
+    def _ready_entries(self) -> list[dict]:
+        """Snapshot the directory entries that are ready for queries."""
+        with self._dirs_lock:
+            return [e for e in self.directories.values() if e.get("state") == "ready"]
+
+    def _dir_lock(self, dir_id: str) -> threading.Lock:
+        """Return the lock serializing work on one directory's index and history."""
+        with self._dirs_lock:
+            return self._dir_locks.setdefault(dir_id, threading.Lock())
+
+    def _current_entry(self, dir_id: str) -> dict | None:
+        """Return the directory's ready entry, re-read after waiting on its lock.
+
+        A reindex replaces the entry and a remove drops it, so a request that
+        queued behind either must not use the entry it looked up earlier.
+        """
+        entry = self.directories.get(dir_id)
+        if entry is None or entry.get("state") != "ready":
+            return None
+        return entry
+
     def handle_init(self, req_id, params: dict) -> dict:
         """Initialize a directory: load model (once), build/reuse index, wire agent."""
+        dir_id = make_dir_id(str(Path(params.get("dataDir", "./test_data")).resolve()))
+        with self._init_lock, self._dir_lock(dir_id):
+            return self._init_directory(req_id, params)
+
+    def _init_directory(self, req_id, params: dict) -> dict:
         from chat import build_index, find_index_path, get_index_name
         from leann import LeannSearcher
         from models import ModelManager
@@ -240,6 +638,12 @@ class Server:
 
         dir_id = make_dir_id(str(data_dir_path))
 
+        # The stats walk only reads the tree, so start it now and let it
+        # overlap model loading and the index build instead of following them
+        walker = ThreadPoolExecutor(max_workers=1)
+        walk_future = walker.submit(self._walk_directory, data_dir_path)
+        walker.shutdown(wait=False)
+
         # Load model only once (shared across directories)
         if self.model is None:
             send(None, "status", {"state": "loading_model"})
@@ -263,9 +667,19 @@ class Server:
             self._log(f"Index built: {index_name}")
 
         index_path = find_index_path(index_name)
-
-        # Wire components
-        leann_searcher = LeannSearcher(index_path, enable_warmup=True)
+        self._indexes_cache = (float("-inf"), [])
+
+        # Wire components. Warming a LeannSearcher loads the index and runs a
+        # query, so reuse the one from an earlier init while the index is unchanged.
+        index_fingerprint = self._index_fingerprint(index_path)
+        cached_searcher = self._leann_searchers.get(index_path)
+        if (cached_searcher and index_fingerprint is not None
+                and cached_searcher[0] == index_fingerprint):
+            leann_searcher = cached_searcher[1]
+            self._log(f"Reusing warmed searcher for {index_name}")
+        else:
+            leann_searcher = LeannSearcher(index_path, enable_warmup=True)
+            self._leann_searchers[index_path] = (index_fingerprint, leann_searcher)
         file_reader = FileReader()
         toolbox = ToolBox(str(data_dir_path), debug=self.debug)
         searcher = Searcher(
@@ -287,28 +701,33 @@ class Server:
             rewriter=self.rewriter, debug=self.debug,
         )
 
-        # Collect stats
-        stats = self._collect_stats(data_dir_path)
+        # Collect stats (the same walk feeds source resolution)
+        walk = walk_future.result()
+        stats = self._stats_from_walk(walk)
 
         # Store directory entry
-        self.directories[dir_id] = {
-            "dir_id": dir_id,
-            "path": str(data_dir_path),
-            "index_name": index_name,
-            "searcher": searcher,
-            "agent": agent,
-            "state": "ready",
-            "stats": stats,
-            "summary": "",
-            "conversation_history": [],
-        }
-
-        # --- Inline summary generation (cached to disk) ---
+        with self._dirs_lock:
+            self.directories[dir_id] = {
+                "dir_id": dir_id,
+                "path": str(data_dir_path),
+                "index_name": index_name,
+                "index_path": index_path,
+                "searcher": searcher,
+                "agent": agent,
+                "state": "ready",
+                "stats": stats,
+                "basename_index": walk["names"],
+                "summary": "",
+                "conversation_history": deque(maxlen=_HISTORY_MAX_MESSAGES),
+            }
+
+        # --- Inline summary generation (cached to disk per index state) ---
         summary = ""
-        summary_path = data_dir_path / ".neurofind" / "summary.txt"
+        summary_path = data_dir_path / ".neurofind" / "summary.json"
         try:
-            if summary_path.exists():
-                summary = summary_path.read_text(encoding="utf-8").strip()
+            cached = self._load_index_cache(summary_path, index_fingerprint)
+            if cached is not None:
+                summary = cached
                 self._log(f"Loaded cached summary for {dir_id}")
             else:
                 send(None, "status", {"state": "summarizing"})
@@ -316,37 +735,59 @@ class Server:
                 summary = self._generate_summary(dir_id)
                 self._log(f"Summary result: {repr(summary[:100]) if summary else '(empty)'}")
                 if summary:
-                    summary_path.parent.mkdir(parents=True, exist_ok=True)
-                    summary_path.write_text(summary, encoding="utf-8")
+                    self._store_index_cache(summary_path, index_fingerprint, summary)
             self.directories[dir_id]["summary"] = summary
         except Exception as exc:
             self._log(f"Summary generation failed: {exc}")
 
-        # --- Inline image captioning ---
+        # --- Inline image captioning (skipped when images are unchanged) ---
+        fingerprint = self._image_fingerprint(walk)
+        fingerprint_path = data_dir_path / ".neurofind" / "caption_fingerprint.json"
         try:
-            from image_captioner import ImageCaptioner
-            from caption_cache import CaptionCache
-
-            cache = CaptionCache(str(data_dir_path / ".neurofind" / "captions"))
-            captioner = ImageCaptioner(
-                model=self.model,
-                index_path=index_path,
-                cache=cache,
-                data_dir=str(data_dir_path),
-                send_fn=send,
-                dir_id=dir_id,
-                debug=self.debug,
-            )
-            captioner.run()
-            # Reload the in-memory index so searches include new captions
-            entry = self.directories.get(dir_id)
-            if entry and "searcher" in entry:
-                from leann import LeannSearcher as _LS
-                entry["searcher"].leann = _LS(index_path, enable_warmup=True)
-                self._log("Reloaded LeannSearcher with caption embeddings.")
-            self._log("Image captioning complete.")
-        except Exception as exc:
-            self._log(f"Image captioning failed: {exc}")
+            previous = json.loads(fingerprint_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous = None
+        if previous == fingerprint:
+            self._log("Images unchanged since last captioning; skipping.")
+        else:
+            try:
+                from image_captioner import ImageCaptioner
+                from caption_cache import CaptionCache
+
+                cache = CaptionCache(str(data_dir_path / ".neurofind" / "captions"))
+                captioner = ImageCaptioner(
+                    model=self.model,
+                    index_path=index_path,
+                    cache=cache,
+                    data_dir=str(data_dir_path),
+                    send_fn=send,
+                    dir_id=dir_id,
+                    debug=self.debug,
+                )
+                injected, failed = captioner.run()
+                # Reload the in-memory index so searches include new captions.
+                # LeannSearcher has no in-place reload; the embedding path was
+                # already warmed by the first instance, so skip the warmup query.
+                entry = self.directories.get(dir_id)
+                if injected:
+                    index_fingerprint = self._index_fingerprint(index_path)
+                    if entry and "searcher" in entry:
+                        entry["searcher"].leann = LeannSearcher(index_path, enable_warmup=False)
+                        self._leann_searchers[index_path] = (index_fingerprint, entry["searcher"].leann)
+                        self._log("Reloaded LeannSearcher with caption embeddings.")
+                    if summary:
+                        # Captions changed the index files; the summary still
+                        # describes it, so re-key it rather than regenerate later
+                        self._store_index_cache(summary_path, index_fingerprint, summary)
+                if failed:
+                    # Leave the fingerprint alone so the next init retries them
+                    self._log(f"Image captioning incomplete: {failed} image(s) failed.")
+                else:
+                    fingerprint_path.parent.mkdir(parents=True, exist_ok=True)
+                    fingerprint_path.write_text(json.dumps(fingerprint), encoding="utf-8")
+                    self._log("Image captioning complete.")
+            except Exception as exc:
+                self._log(f"Image captioning failed: {exc}")
 
         # --- Now mark ready ---
         self.state = "ready"
@@ -382,7 +823,7 @@ class Server:
         dir_id = params.get("directoryId")
         if dir_id is None:
             # Fall back to first ready directory
-            ready = [e for e in self.directories.values() if e.get("state") == "ready"]
+            ready = self._ready_entries()
             if not ready:
                 return {"id": req_id, "type": "error", "data": {"message": "No ready directories"}}
             entry = ready[0]
@@ -393,6 +834,15 @@ class Server:
             if entry.get("state") != "ready":
                 return {"id": req_id, "type": "error", "data": {"message": f"Directory not ready: {dir_id}"}}
 
+        dir_id = entry["dir_id"]
+        with self._dir_lock(dir_id):
+            entry = self._current_entry(dir_id)
+            if entry is None:
+                return {"id": req_id, "type": "error", "data": {"message": f"Directory not ready: {dir_id}"}}
+            return self._query_directory(req_id, entry, query)
+
+    def _query_directory(self, req_id, entry: dict, query: str) -> dict:
+        """Run the agent on one directory; the caller holds its lock."""
         self._log(f"Query: {query[:80]}")
 
         if self.debug:
@@ -413,85 +863,80 @@ class Server:
 
         response, sources = agent.run(
             query,
-            history=conversation_history,
+            history=list(conversation_history),
             on_token=on_token,
             on_step=on_step,
         )
 
-        # Resolve source filenames to absolute paths
-        base_dir = entry["path"]
-        resolved = []
-        for s in sources:
-            full = os.path.join(base_dir, s)
-            if os.path.exists(full):
-                resolved.append(full)
-            else:
-                found = False
-                for root, dirs, files in os.walk(base_dir):
-                    if s in files:
-                        resolved.append(os.path.join(root, s))
-                        found = True
-                        break
-                if not found:
-                    resolved.append(s)
+        resolved = self._resolve_sources(entry, sources)
 
         conversation_history.append({"role": "user", "content": query})
         conversation_history.append({"role": "assistant", "content": response})
-        if len(conversation_history) > 10:
-            entry["conversation_history"] = conversation_history[-10:]
 
         return {"id": req_id, "type": "result", "data": {"text": response, "sources": resolved}}
 
     def _query_all(self, req_id, query: str) -> dict:
-        """Run query against all ready directories and merge results."""
-        results = []
-        for entry in self.directories.values():
-            if entry.get("state") != "ready":
-                continue
-            agent = entry["agent"]
-            conversation_history = entry["conversation_history"]
+        """Run query against all ready directories concurrently and merge results.
+
+        Generation is still serialized by ModelManager's lock, but retrieval
+        and tool calls for one directory overlap with generation for another.
+        Results keep the order of the ready directories, and so do streamed
+        tokens: the UI renders them as one message, so each directory's
+        tokens are sent only after every earlier directory's.
+        """
+        ready = self._ready_entries()
+        if not ready:
+            return {"id": req_id, "type": "result", "data": {"results": []}}
+        relay = _OrderedTokenRelay(req_id, [entry["dir_id"] for entry in ready])
+
+        def run_entry(i: int) -> dict:
+            try:
+                return self._query_entry(req_id, ready[i], query, relay.on_token(i))
+            finally:
+                relay.finish(i)
 
-            def on_token(text):
-                send(req_id, "token", {"text": text})
+        with ThreadPoolExecutor(max_workers=min(len(ready), _QUERY_ALL_WORKERS)) as pool:
+            results = list(pool.map(run_entry, range(len(ready))))
+        return {"id": req_id, "type": "result", "data": {"results": results}}
 
-            response, sources = agent.run(query, history=conversation_history, on_token=on_token)
+    def _query_entry(self, req_id, entry: dict, query: str, on_token) -> dict:
+        """Run one directory's part of a searchAll query."""
+        dir_id = entry["dir_id"]
+        with self._dir_lock(dir_id):
+            entry = self._current_entry(dir_id)
+            if entry is None:
+                return {"directoryId": dir_id, "text": "", "sources": []}
+            return self._query_entry_locked(req_id, entry, query, on_token)
 
-            # Resolve source filenames to absolute paths
-            base_dir = entry["path"]
-            resolved = []
-            for s in sources:
-                full = os.path.join(base_dir, s)
-                if os.path.exists(full):
-                    resolved.append(full)
-                else:
-                    found = False
-                    for root, dirs, files in os.walk(base_dir):
-                        if s in files:
-                            resolved.append(os.path.join(root, s))
-                            found = True
-                            break
-                    if not found:
-                        resolved.append(s)
-
-            conversation_history.append({"role": "user", "content": query})
-            conversation_history.append({"role": "assistant", "content": response})
-            if len(conversation_history) > 10:
-                entry["conversation_history"] = conversation_history[-10:]
-
-            results.append({"directoryId": entry["dir_id"], "text": response, "sources": resolved})
+    def _query_entry_locked(self, req_id, entry: dict, query: str, on_token) -> dict:
+        """Run the agent for _query_entry; the caller holds the directory lock."""
+        agent = entry["agent"]
+        conversation_history = entry["conversation_history"]
+        dir_id = entry["dir_id"]
 
-        return {"id": req_id, "type": "result", "data": {"results": results}}
+        response, sources = agent.run(query, history=list(conversation_history), on_token=on_token)
+
+        resolved = self._resolve_sources(entry, sources)
+
+        conversation_history.append({"role": "user", "content": query})
+        conversation_history.append({"role": "assistant", "content": response})
+
+        return {"directoryId": dir_id, "text": response, "sources": resolved}
 
     def handle_remove_directory(self, req_id, params: dict) -> dict:
         """Remove a directory from the server and delete its index from disk."""
         dir_id = params.get("directoryId")
         if not dir_id or dir_id not in self.directories:
             return {"id": req_id, "type": "error", "data": {"message": f"Unknown directory: {dir_id}"}}
-        entry = self.directories.pop(dir_id)
-        self._delete_index_files(entry)
-        # If no directories left, reset state
-        if not self.directories:
-            self.state = "not_initialized"
+        with self._init_lock, self._dir_lock(dir_id):
+            with self._dirs_lock:
+                entry = self.directories.pop(dir_id, None)
+                if entry is None:
+                    return {"id": req_id, "type": "error", "data": {"message": f"Unknown directory: {dir_id}"}}
+                # If no directories left, reset state
+                if not self.directories:
+                    self.state = "not_initialized"
+            self._delete_index_files(entry)
         return {"id": req_id, "type": "result", "data": {"status": "ok"}}
 
     def handle_reindex(self, req_id, params: dict) -> dict:
@@ -499,28 +944,38 @@ class Server:
         dir_id = params.get("directoryId")
         if not dir_id or dir_id not in self.directories:
             return {"id": req_id, "type": "error", "data": {"message": f"Unknown directory: {dir_id}"}}
-        entry = self.directories[dir_id]
-        # Delete old index files from disk
-        self._delete_index_files(entry)
-        # Clear cached file graph so it's recomputed after reindex
-        entry.pop("file_graph", None)
-        stored_path = entry["path"]
-        # Invalidate cached summary so it's regenerated
-        summary_path = Path(stored_path) / ".neurofind" / "summary.txt"
-        if summary_path.exists():
-            summary_path.unlink()
-            self._log(f"Cleared cached summary for {dir_id}")
-        return self.handle_init(req_id, {"dataDir": stored_path})
-
-    def handle_list_indexes(self, req_id) -> dict:
-        """List available LEANN indexes."""
-        indexes = []
-        for base in [Path(".leann/indexes"), Path.home() / ".leann/indexes"]:
-            if base.is_dir():
-                for d in sorted(base.iterdir()):
-                    if d.is_dir():
-                        indexes.append(d.name)
-        return {"id": req_id, "type": "result", "data": {"indexes": indexes}}
+        # Delete and rebuild as one step, so no query, file graph or other
+        # init touches the index in between
+        with self._init_lock, self._dir_lock(dir_id):
+            entry = self.directories.get(dir_id)
+            if entry is None:
+                return {"id": req_id, "type": "error", "data": {"message": f"Unknown directory: {dir_id}"}}
+            # Delete old index files from disk
+            self._delete_index_files(entry)
+            # Clear cached file graph so it's recomputed after reindex
+            entry.pop("file_graph", None)
+            stored_path = entry["path"]
+            # Invalidate cached summary so it's regenerated
+            summary_path = Path(stored_path) / ".neurofind" / "summary.json"
+            if summary_path.exists():
+                summary_path.unlink()
+                self._log(f"Cleared cached summary for {dir_id}")
+            return self._init_directory(req_id, {"dataDir": stored_path})
+
+    def handle_list_indexes(self, req_id, params: dict | None = None) -> dict:
+        """List available LEANN indexes (cached briefly, the UI polls this)."""
+        now = time.monotonic()
+        stamp, indexes = self._indexes_cache
+        if now - stamp >= _INDEXES_CACHE_TTL:
+            indexes = []
+            for base in (".leann/indexes", str(Path.home() / ".leann/indexes")):
+                try:
+                    with os.scandir(base) as it:
+                        indexes.extend(sorted(e.name for e in it if e.is_dir()))
+                except OSError:
+                    continue
+            self._indexes_cache = (now, indexes)
+        return {"id": req_id, "type": "result", "data": {"indexes": list(indexes)}}
 
     def handle_get_file_graph(self, req_id, params: dict) -> dict:
         """Compute and return the file relationship graph."""
@@ -532,20 +987,36 @@ class Server:
         if entry.get("state") != "ready":
             return {"id": req_id, "type": "error", "data": {"message": f"Directory not ready: {dir_id}"}}
 
-        # Return cached graph if available
-        if "file_graph" in entry:
-            return {"id": req_id, "type": "result", "data": entry["file_graph"]}
-
-        searcher = entry.get("searcher")
-        if not searcher:
-            return {"id": req_id, "type": "error", "data": {"message": "No searcher available"}}
+        with self._dir_lock(dir_id):
+            entry = self._current_entry(dir_id)
+            if entry is None:
+                return {"id": req_id, "type": "error", "data": {"message": f"Directory not ready: {dir_id}"}}
 
-        self._log(f"Computing file graph for {dir_id}...")
-        graph = build_file_graph(searcher.leann, entry["path"])
-        entry["file_graph"] = graph
-        self._log(f"File graph: {len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
+            # Return cached graph if available
+            if "file_graph" in entry:
+                return {"id": req_id, "type": "result", "data": entry["file_graph"]}
+
+            searcher = entry.get("searcher")
+            if not searcher:
+                return {"id": req_id, "type": "error", "data": {"message": "No searcher available"}}
+
+            # The graph depends only on the index, so a copy persisted next to
+            # the summary stays valid until the index files change
+            graph_path = Path(entry["path"]) / ".neurofind" / "file_graph.json"
+            index_path = entry.get("index_path")
+            fingerprint = self._index_fingerprint(index_path) if index_path else None
+            graph = self._load_index_cache(graph_path, fingerprint)
+            if graph is not None:
+                self._log(f"Loaded cached file graph for {dir_id}")
+            else:
+                from graph import build_file_graph
+                self._log(f"Computing file graph for {dir_id}...")
+                graph = build_file_graph(searcher.leann, entry["path"])
+                self._store_index_cache(graph_path, fingerprint, graph)
+            entry["file_graph"] = graph
+            self._log(f"File graph: {len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
 
-        return {"id": req_id, "type": "result", "data": graph}
+            return {"id": req_id, "type": "result", "data": graph}
 
     def handle_check_models(self, req_id, params: dict) -> dict:
         """Check which models are present/missing in the models directory."""
@@ -575,59 +1046,71 @@ class Server:
         }
 
     def handle_download_models(self, req_id, params: dict) -> dict:
-        """Download missing models with setup_progress NDJSON events."""
+        """Download missing models with setup_progress NDJSON events.
+
+        Missing models download in parallel; the downloads are network-bound
+        and send() is safe to call from the worker threads.
+        """
         models_dir = get_models_dir()
         models_dir.mkdir(parents=True, exist_ok=True)
 
         manifest = load_manifest()
+        missing = [
+            model for model in manifest["models"]
+            if model.get("required", False) and not (models_dir / model["filename"]).is_file()
+        ]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(4, len(missing))) as pool:
+                errors = list(pool.map(lambda m: self._download_model(models_dir, m), missing))
+            for model, error in zip(missing, errors):
+                if error is not None:
+                    return {
+                        "id": req_id,
+                        "type": "error",
+                        "data": {"message": f"Failed to download {model['id']}: {error}"},
+                    }
 
-        for model in manifest["models"]:
-            if not model.get("required", False):
-                continue
+        return {
+            "id": req_id,
+            "type": "result",
+            "data": {"status": "all_models_ready"},
+        }
 
-            model_path = models_dir / model["filename"]
-            if model_path.is_file():
-                continue
+    def _download_model(self, models_dir: Path, model: dict) -> str | None:
+        """Download one model, reporting progress. Returns an error message or None."""
+        model_id = model["id"]
+        filename = model["filename"]
+
+        send(None, "setup_progress", {
+            "model_id": model_id,
+            "filename": filename,
+            "status": "downloading",
+        })
 
-            model_id = model["id"]
-            filename = model["filename"]
-            repo_id = model["repo_id"]
+        from huggingface_hub import hf_hub_download
 
+        try:
+            hf_hub_download(
+                repo_id=model["repo_id"],
+                filename=filename,
+                local_dir=str(models_dir),
+            )
+        except Exception as exc:
             send(None, "setup_progress", {
                 "model_id": model_id,
                 "filename": filename,
-                "status": "downloading",
+                "status": "error",
+                "error": str(exc),
             })
+            return str(exc)
 
-            try:
-                hf_hub_download(
-                    repo_id=repo_id,
-                    filename=filename,
-                    local_dir=str(models_dir),
-                )
-                send(None, "setup_progress", {
-                    "model_id": model_id,
-                    "filename": filename,
-                    "status": "complete",
-                })
-            except Exception as exc:
-                send(None, "setup_progress", {
-                    "model_id": model_id,
-                    "filename": filename,
-                    "status": "error",
-                    "error": str(exc),
-                })
-                return {
-                    "id": req_id,
-                    "type": "error",
-                    "data": {"message": f"Failed to download {model_id}: {exc}"},
-                }
-
-        return {
-            "id": req_id,
-            "type": "result",
-            "data": {"status": "all_models_ready"},
-        }
+        send(None, "setup_progress", {
+            "model_id": model_id,
+            "filename": filename,
+            "status": "complete",
+        })
+        return None
 
     def dispatch(self, req: dict):
         """Route a parsed request to the appropriate handler."""
@@ -635,33 +1118,36 @@ class Server:
         method = req["method"]
         params = req.get("params", {})
 
-        handlers = {
-            "ping": lambda: self.handle_ping(req_id),
-            "init": lambda: self.handle_init(req_id, params),
-            "query": lambda: self.handle_query(req_id, params),
-            "toggle_debug": lambda: self.handle_toggle_debug(req_id),
-            "list_indexes": lambda: self.handle_list_indexes(req_id),
-            "shutdown": lambda: self.handle_shutdown(req_id),
-            "remove_directory": lambda: self.handle_remove_directory(req_id, params),
-            "reindex": lambda: self.handle_reindex(req_id, params),
-            "getFileGraph": lambda: self.handle_get_file_graph(req_id, params),
-            "check_models": lambda: self.handle_check_models(req_id, params),
-            "download_models": lambda: self.handle_download_models(req_id, params),
-        }
-
-        handler = handlers.get(method)
+        handler = self._handlers.get(method)
         if not handler:
             return {"id": req_id, "type": "error", "data": {"message": f"Unknown method: {method}"}}
 
         try:
-            return handler()
+            return handler(req_id, params)
         except Exception as e:
             self._log(f"Handler error ({method}): {e}")
             return {"id": req_id, "type": "error", "data": {"message": "Internal server error"}}
 
+    def _emit_result(self, future) -> None:
+        """Done-callback for pooled dispatch: send the handler's response."""
+        try:
+            result = future.result()
+        except Exception as exc:
+            self._log(f"Dispatch failed: {exc}")
+            return
+        if result:
+            send(result["id"], result["type"], result["data"])
+
     def run(self, input_stream=None):
-        """Main loop: read stdin, dispatch, write stdout."""
-        stream = input_stream or sys.stdin
+        """Main loop: read stdin, dispatch, write stdout.
+
+        ping, toggle_debug and list_indexes are answered inline; init,
+        reindex and remove_directory run in order on the index worker; the
+        rest run on the request pool. shutdown is handled inline once
+        in-flight requests have finished, so its response is the last line
+        written.
+        """
+        stream = input_stream or sys.stdin.buffer
         self._log("Server ready, waiting for commands...")
         for line in stream:
             line = line.strip()
@@ -673,39 +1159,39 @@ class Server:
                 send(None, "error", {"message": "Invalid JSON"})
                 continue
 
-            result = self.dispatch(req)
-            if result:
-                print(format_response(result["id"], result["type"], result["data"]), flush=True)
-
-            if not self.running:
+            method = req["method"]
+            if method == "shutdown":
+                self._index_pool.shutdown(wait=True)
+                self._pool.shutdown(wait=True)
+                result = self.dispatch(req)
+                send(result["id"], result["type"], result["data"])
                 break
 
+            if method in _INLINE_METHODS:
+                result = self.dispatch(req)
+                send(result["id"], result["type"], result["data"])
+                continue
+
+            pool = self._index_pool if method in _INDEX_METHODS else self._pool
+            future = pool.submit(self.dispatch, req)
+            future.add_done_callback(self._emit_result)
+
+        self._index_pool.shutdown(wait=True)
+        self._pool.shutdown(wait=True)
 
-if __name__ == "__main__":
-    import os
-    import builtins
 
-    # Save real stdout fd for NDJSON protocol messages
+if __name__ == "__main__":
+    # Save real stdout fd for NDJSON protocol messages; send() writes
+    # encoded lines to it directly
     _real_stdout_fd = os.dup(1)
-    _real_stdout = os.fdopen(_real_stdout_fd, "w")
+    _protocol_out = os.fdopen(_real_stdout_fd, "wb")
 
     # Redirect fd 1 to stderr so C libraries (llama.cpp, ggml)
     # that write directly to fd 1 go to stderr instead
     os.dup2(2, 1)
 
-    # Also redirect Python-level stdout to stderr
+    # Also redirect Python-level stdout (debug prints) to stderr
     sys.stdout = sys.stderr
 
-    # Override print so protocol sends (flush=True) go to the real stdout
-    _original_print = builtins.print
-
-    def _ndjson_print(*args, **kwargs):
-        """Print to real stdout only when flush=True (our protocol sends)."""
-        if kwargs.get("flush"):
-            kwargs["file"] = _real_stdout
-        _original_print(*args, **kwargs)
-
-    builtins.print = _ndjson_print
-
     server = Server()
-    server.run(sys.stdin)
+    server.run(sys.stdin.buffer)
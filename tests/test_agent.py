@@ -1,6 +1,5 @@
 """Tests for Agent — orchestrator agent loop."""
 import json
-from unittest.mock import MagicMock
 from agent import Agent
 
 
@@ -28,10 +27,18 @@ class FakeRouter:
         return self.tool_name, self.params
 
 
+class FakeModel:
+    def __init__(self, responses):
+        self._responses = iter(responses)
+        self.calls = []
+
+    def generate(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        return next(self._responses)
+
+
 def _make_model(responses):
-    model = MagicMock()
-    model.generate = MagicMock(side_effect=list(responses))
-    return model
+    return FakeModel(responses)
 
 
 def test_model_tool_call_semantic_search():
@@ -109,7 +116,7 @@ def test_max_steps_forces_synthesis():
     answer, sources = agent.run("complex question")
 
     assert answer == "Final forced answer."
-    assert model.generate.call_count == 6  # 5 tool calls + 1 forced synthesis
+    assert len(model.calls) == 6  # 5 tool calls + 1 forced synthesis
 
 
 def test_conversation_history_passed():
@@ -130,8 +137,7 @@ def test_conversation_history_passed():
     agent.run("aren't there more?", history=history)
 
     # Check that history was included in messages
-    call_args = model.generate.call_args_list[0]
-    messages = call_args[0][0] if call_args[0] else call_args.kwargs.get("messages", [])
+    messages = model.calls[0][0]
     user_contents = [m["content"] for m in messages if m["role"] == "user"]
     assert "find invoices" in user_contents
     assert "aren't there more?" in user_contents
@@ -157,8 +163,7 @@ def test_history_capped_at_4_messages():
     # Verify the initial messages list before any tool results were appended:
     # system + 4 history + 1 current query = 6
     # We check that only 4 history messages (last 4) were included
-    call_args = model.generate.call_args_list[0]
-    messages = call_args[0][0] if call_args[0] else call_args.kwargs.get("messages", [])
+    messages = model.calls[0][0]
     history_msgs = [m for m in messages if m["role"] == "user" and m["content"].startswith("q")]
     assert len(history_msgs) == 4
     assert history_msgs[0]["content"] == "q6"
@@ -460,3 +465,13 @@ def test_run_returns_sources():
 
     assert answer == "The budget is $450k."
     assert "budget.pdf" in sources
+
+
+def test_parse_tool_call_ignores_prose_and_non_object_json():
+    """Outputs without a call or JSON object are not tool calls."""
+    agent = Agent(_make_model([]), FakeToolRegistry(), FakeRouter())
+    assert agent._parse_tool_call("You have 3 invoices, all from March.") is None
+    assert agent._parse_tool_call('"name"') is None
+    assert agent._parse_tool_call('{"name": "count_files", "params": {}}') == {
+        "name": "count_files", "params": {},
+    }
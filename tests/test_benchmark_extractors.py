@@ -1,18 +1,32 @@
 """Tests for benchmark_extractors — benchmark script comparing docling vs kreuzberg."""
 import tempfile
+import time
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 import pytest
 
+from benchmark_extractors import build_parser, run_benchmark
+
+
+class FakeReader:
+    """Stands in for FileReader: counts reads and delegates to read_fn."""
+
+    def __init__(self, read_fn):
+        self.read_fn = read_fn
+        self.calls = 0
+
+    def read(self, path):
+        self.calls += 1
+        return self.read_fn(path)
+
 
 # --- Acceptance test (step 03-01) ---
 
 
 def test_benchmark_runs_both_backends_and_reports_timing_and_lengths():
-    """Acceptance: benchmark runs warmup + 3 trials per backend per file,
+    """Acceptance: benchmark runs a warmup + 3 timed samples per backend per file,
     reports mean times and output lengths for parity comparison."""
-    from benchmark_extractors import run_benchmark
 
     # Create a temp directory with two test files
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -23,20 +37,13 @@ def test_benchmark_runs_both_backends_and_reports_timing_and_lengths():
         mock_readers = {}
 
         def fake_from_backend(backend, **kwargs):
-            reader = MagicMock()
-            call_count = {"n": 0}
-
-            def fake_read(path):
-                call_count["n"] += 1
-                return f"extracted by {backend} from {Path(path).name} (call {call_count['n']})"
-
-            reader.read.side_effect = fake_read
+            reader = FakeReader(lambda path: f"extracted by {backend} from {Path(path).name}")
             mock_readers[backend] = reader
             return reader
 
         with patch("benchmark_extractors.FileReader") as mock_file_reader:
             mock_file_reader.from_backend.side_effect = fake_from_backend
-            results = run_benchmark(tmpdir, num_trials=3)
+            results = run_benchmark(tmpdir, num_trials=3, min_sample_time=0)
 
         # Verify structure: results for both backends
         assert "docling" in results
@@ -59,57 +66,98 @@ def test_benchmark_runs_both_backends_and_reports_timing_and_lengths():
                 assert isinstance(file_result["output_length"], int)
                 assert file_result["output_length"] > 0
 
-        # Verify each backend reader was called:
-        # 1 warmup + (3 trials x 2 files) = 7 calls per backend
+        # Verify each backend reader was called (one call per sample at
+        # min_sample_time=0): (1 warmup + 3 samples) x 2 files = 8 per backend
         for backend in ("docling", "kreuzberg"):
-            assert mock_readers[backend].read.call_count == 7
+            assert mock_readers[backend].calls == 8
 
 
 # --- Unit tests (step 03-01) ---
-# Test Budget: 4 behaviors x 2 = 8 unit tests max. Using 4.
+# Test Budget: 6 behaviors x 2 = 12 unit tests max. Using 6.
 
 
 def test_benchmark_computes_mean_time_from_trials():
     """run_benchmark() computes mean wall-clock time across num_trials for each file."""
-    from benchmark_extractors import run_benchmark
 
     with tempfile.TemporaryDirectory() as tmpdir:
         (Path(tmpdir) / "single.pdf").write_bytes(b"pdf")
 
         def fake_from_backend(backend, **kwargs):
-            reader = MagicMock()
-            reader.read.return_value = "extracted text"
-            return reader
+            return FakeReader(lambda path: "extracted text")
 
         with patch("benchmark_extractors.FileReader") as mock_fr:
             mock_fr.from_backend.side_effect = fake_from_backend
-            results = run_benchmark(tmpdir, num_trials=5)
+            results = run_benchmark(tmpdir, num_trials=5, min_sample_time=0)
 
-        # Mean time must be a float (we can't predict exact value but it must be >= 0)
+        # Timings must be floats (we can't predict exact values but they must be >= 0)
         for backend in ("docling", "kreuzberg"):
             assert len(results[backend]) == 1
-            assert results[backend][0]["mean_time"] >= 0.0
-            assert isinstance(results[backend][0]["mean_time"], float)
+            result = results[backend][0]
+            assert result["mean_time"] >= 0.0
+            assert isinstance(result["mean_time"], float)
+            assert 0.0 <= result["min_time"] <= result["median_time"]
+            assert isinstance(result["median_time"], float)
+
+
+def test_benchmark_batches_fast_extractions_per_sample():
+    """Extractions much faster than min_sample_time are repeated within each sample."""
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        (Path(tmpdir) / "fast.pdf").write_bytes(b"pdf")
+        readers = {}
+
+        def fake_from_backend(backend, **kwargs):
+            readers[backend] = FakeReader(lambda path: "text")
+            return readers[backend]
+
+        with patch("benchmark_extractors.FileReader") as mock_fr:
+            mock_fr.from_backend.side_effect = fake_from_backend
+            results = run_benchmark(tmpdir, num_trials=2, min_sample_time=0.005)
+
+        for backend in ("docling", "kreuzberg"):
+            assert readers[backend].calls > 1 + 2
+            result = results[backend][0]
+            assert 0 <= result["min_time"] <= result["mean_time"]
+
+
+def test_benchmark_sizes_samples_from_a_warm_read():
+    """A slow first read (model load) does not force single-read samples."""
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        (Path(tmpdir) / "fast.pdf").write_bytes(b"pdf")
+        readers = {}
+
+        def fake_from_backend(backend, **kwargs):
+            def read(path):
+                if readers[backend].calls == 1:
+                    time.sleep(0.05)  # cold start
+                return "text"
+            readers[backend] = FakeReader(read)
+            return readers[backend]
+
+        with patch("benchmark_extractors.FileReader") as mock_fr:
+            mock_fr.from_backend.side_effect = fake_from_backend
+            results = run_benchmark(tmpdir, num_trials=2, min_sample_time=0.01)
+
+        for backend in ("docling", "kreuzberg"):
+            # warmup + sizing read + 2 samples of several reads each
+            assert readers[backend].calls > 2 + 2 * 2
+            assert results[backend][0]["min_time"] < 0.05
 
 
 def test_benchmark_reports_output_length_per_backend():
     """run_benchmark() reports output length (chars) for each backend-file pair."""
-    from benchmark_extractors import run_benchmark
 
     with tempfile.TemporaryDirectory() as tmpdir:
         (Path(tmpdir) / "test.pdf").write_bytes(b"pdf")
 
         def fake_from_backend(backend, **kwargs):
-            reader = MagicMock()
-            if backend == "docling":
-                reader.read.return_value = "short"
-            else:
-                reader.read.return_value = "a much longer text output"
-            return reader
+            output = "short" if backend == "docling" else "a much longer text output"
+            return FakeReader(lambda path: output)
 
         with patch("benchmark_extractors.FileReader") as mock_fr:
             mock_fr.from_backend.side_effect = fake_from_backend
-            results = run_benchmark(tmpdir, num_trials=1)
+            results = run_benchmark(tmpdir, num_trials=1, min_sample_time=0)
 
         assert results["docling"][0]["output_length"] == len("short")
         assert results["kreuzberg"][0]["output_length"] == len("a much longer text output")
@@ -117,27 +165,23 @@ def test_benchmark_reports_output_length_per_backend():
 
 def test_benchmark_handles_backend_error_gracefully():
     """run_benchmark() records error and continues when a backend fails on a file."""
-    from benchmark_extractors import run_benchmark
 
     with tempfile.TemporaryDirectory() as tmpdir:
         (Path(tmpdir) / "bad.pdf").write_bytes(b"pdf")
         (Path(tmpdir) / "good.pdf").write_bytes(b"pdf")
 
         def fake_from_backend(backend, **kwargs):
-            reader = MagicMock()
             if backend == "docling":
                 def read_with_error(path):
                     if "bad" in str(path):
                         raise RuntimeError("conversion failed")
                     return "good result"
-                reader.read.side_effect = read_with_error
-            else:
-                reader.read.return_value = "kreuzberg output"
-            return reader
+                return FakeReader(read_with_error)
+            return FakeReader(lambda path: "kreuzberg output")
 
         with patch("benchmark_extractors.FileReader") as mock_fr:
             mock_fr.from_backend.side_effect = fake_from_backend
-            results = run_benchmark(tmpdir, num_trials=1)
+            results = run_benchmark(tmpdir, num_trials=1, min_sample_time=0)
 
         # Docling should have error for bad.pdf but success for good.pdf
         docling_results = {r["filename"]: r for r in results["docling"]}
@@ -151,7 +195,6 @@ def test_benchmark_handles_backend_error_gracefully():
 
 def test_benchmark_cli_parses_dir_argument():
     """CLI entry point parses --dir argument and calls run_benchmark."""
-    from benchmark_extractors import build_parser
 
     parser = build_parser()
     args = parser.parse_args(["--dir", "/some/path"])
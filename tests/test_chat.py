@@ -0,0 +1,31 @@
+"""Tests for chat.py's command-line handling."""
+from unittest.mock import patch
+
+import pytest
+
+import chat
+
+
+def test_main_builds_index_for_given_directory(tmp_path, monkeypatch):
+    """main(argv) parses the argument list it is given, not sys.argv."""
+    monkeypatch.setattr("sys.argv", ["chat.py", "--reuse", "ignored"])
+    with patch("chat.build_index", return_value="docs") as build, \
+         patch("chat.chat_loop") as loop:
+        chat.main([str(tmp_path), "--force"])
+
+    build.assert_called_once_with(tmp_path.resolve(), force=True)
+    loop.assert_called_once_with("docs", str(tmp_path.resolve()))
+
+
+def test_main_reuses_named_index(tmp_path):
+    with patch("chat.build_index") as build, patch("chat.chat_loop") as loop:
+        chat.main(["--reuse", "myindex", str(tmp_path)])
+
+    build.assert_not_called()
+    loop.assert_called_once_with("myindex", str(tmp_path.resolve()))
+
+
+def test_main_rejects_reuse_without_name():
+    with patch("chat.chat_loop") as loop, pytest.raises(SystemExit):
+        chat.main(["--reuse"])
+    loop.assert_not_called()
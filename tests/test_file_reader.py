@@ -1,29 +1,47 @@
 """Tests for FileReader — on-demand text extraction via Docling."""
 import asyncio
-import tempfile
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+import file_reader
 from file_reader import DoclingExtractor, FileReader, TextExtractor
 
 
-def test_read_text_file():
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write("Hello world, this is a test document.")
-        f.flush()
-        reader = FileReader()
-        text = reader.read(f.name)
+@pytest.fixture(autouse=True)
+def fresh_docling_converter(monkeypatch):
+    """Each test builds its own shared converter, from whatever class it patched in."""
+    monkeypatch.setattr(file_reader, "_converter", None)
+
+
+class FakeKreuzberg:
+    """Stands in for the kreuzberg module: async extract_file with a canned outcome."""
+
+    def __init__(self, content="", error=None):
+        self.content = content
+        self.error = error
+
+    async def extract_file(self, path):
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(content=self.content)
+
+
+def test_read_text_file(tmp_path):
+    path = tmp_path / "hello.txt"
+    path.write_text("Hello world, this is a test document.")
+    reader = FileReader()
+    text = reader.read(str(path))
     assert "Hello world" in text
 
 
-def test_read_markdown_file():
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".md", delete=False) as f:
-        f.write("# Heading\n\nSome markdown content here.")
-        f.flush()
-        reader = FileReader()
-        text = reader.read(f.name)
+def test_read_markdown_file(tmp_path):
+    path = tmp_path / "heading.md"
+    path.write_text("# Heading\n\nSome markdown content here.")
+    reader = FileReader()
+    text = reader.read(str(path))
     assert "Heading" in text
     assert "markdown content" in text
 
@@ -34,12 +52,11 @@ def test_read_nonexistent_file():
     assert "error" in text.lower() or "not found" in text.lower() or "failed" in text.lower()
 
 
-def test_truncation():
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write("x" * 10000)
-        f.flush()
-        reader = FileReader(max_chars=100)
-        text = reader.read(f.name)
+def test_truncation(tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"x" * 10000)
+    reader = FileReader(max_chars=100)
+    text = reader.read(str(path))
     assert len(text) <= 100
 
 
@@ -65,7 +82,7 @@ def test_docling_extractor_lazy_loads_converter():
 
 
 @patch("docling.document_converter.DocumentConverter")
-def test_docling_extractor_extract_returns_markdown(mock_converter_cls):
+def test_docling_extractor_extract_returns_markdown(mock_converter_cls, tmp_path):
     """extract() converts a file and returns markdown text."""
     mock_converter = MagicMock()
     mock_result = MagicMock()
@@ -73,29 +90,69 @@ def test_docling_extractor_extract_returns_markdown(mock_converter_cls):
     mock_converter.convert.return_value = mock_result
     mock_converter_cls.return_value = mock_converter
 
+    path = tmp_path / "fake.pdf"
+    path.write_bytes(b"fake pdf content")
     extractor = DoclingExtractor()
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-        f.write(b"fake pdf content")
-        f.flush()
-        result = extractor.extract(Path(f.name))
+    result = extractor.extract(path)
 
     assert result == "# Extracted Content"
     mock_converter.convert.assert_called_once()
 
 
 @patch("docling.document_converter.DocumentConverter")
-def test_docling_extractor_raises_on_conversion_failure(mock_converter_cls):
+def test_docling_extractor_raises_on_conversion_failure(mock_converter_cls, tmp_path):
     """extract() raises an exception when Docling conversion fails."""
     mock_converter = MagicMock()
     mock_converter.convert.side_effect = RuntimeError("conversion failed")
     mock_converter_cls.return_value = mock_converter
 
+    path = tmp_path / "fake.pdf"
+    path.write_bytes(b"fake pdf content")
     extractor = DoclingExtractor()
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-        f.write(b"fake pdf content")
-        f.flush()
-        with pytest.raises(RuntimeError, match="conversion failed"):
-            extractor.extract(Path(f.name))
+    with pytest.raises(RuntimeError, match="conversion failed"):
+        extractor.extract(path)
+
+
+@patch("docling.document_converter.DocumentConverter")
+def test_docling_extractors_share_one_converter(mock_converter_cls):
+    """The converter's models load once, however many extractors are created."""
+    first = DoclingExtractor()._get_converter()
+    second = DoclingExtractor()._get_converter()
+
+    assert first is second
+    mock_converter_cls.assert_called_once()
+
+
+@patch("docling.document_converter.DocumentConverter")
+def test_docling_extractors_never_convert_concurrently(mock_converter_cls, tmp_path):
+    """The shared converter is used by one thread at a time."""
+    import threading
+    import time
+
+    active = []
+    overlap = []
+
+    def convert(path):
+        active.append(path)
+        overlap.append(len(active))
+        time.sleep(0.01)
+        active.remove(path)
+        return MagicMock()
+
+    mock_converter_cls.return_value.convert.side_effect = convert
+    paths = []
+    for i in range(4):
+        paths.append(tmp_path / f"doc{i}.pdf")
+        paths[-1].write_bytes(b"pdf")
+
+    threads = [threading.Thread(target=DoclingExtractor().extract, args=(p,)) for p in paths]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert len(overlap) == 4
+    assert max(overlap) == 1
 
 
 # --- KreuzbergExtractor tests ---
@@ -105,7 +162,7 @@ def test_kreuzberg_extractor_satisfies_text_extractor_protocol():
     """KreuzbergExtractor must be a structural subtype of TextExtractor."""
     from file_reader import KreuzbergExtractor
 
-    with patch.dict("sys.modules", {"kreuzberg": MagicMock()}):
+    with patch.dict("sys.modules", {"kreuzberg": FakeKreuzberg()}):
         extractor = KreuzbergExtractor()
     assert isinstance(extractor, TextExtractor)
 
@@ -114,16 +171,9 @@ def test_kreuzberg_extractor_extract_returns_plain_text():
     """extract() calls kreuzberg.extract_file async and returns content string."""
     from file_reader import KreuzbergExtractor
 
-    mock_kreuzberg = MagicMock()
-    mock_result = MagicMock()
-    mock_result.content = "Extracted plain text from PDF"
-
-    async def fake_extract_file(path):
-        return mock_result
+    fake_kreuzberg = FakeKreuzberg(content="Extracted plain text from PDF")
 
-    mock_kreuzberg.extract_file = fake_extract_file
-
-    with patch.dict("sys.modules", {"kreuzberg": mock_kreuzberg}):
+    with patch.dict("sys.modules", {"kreuzberg": fake_kreuzberg}):
         extractor = KreuzbergExtractor()
         result = extractor.extract(Path("/tmp/test.pdf"))
 
@@ -143,14 +193,9 @@ def test_kreuzberg_extractor_propagates_extraction_errors():
     """extract() propagates exceptions from kreuzberg.extract_file."""
     from file_reader import KreuzbergExtractor
 
-    mock_kreuzberg = MagicMock()
-
-    async def fake_extract_file(path):
-        raise RuntimeError("extraction failed")
-
-    mock_kreuzberg.extract_file = fake_extract_file
+    fake_kreuzberg = FakeKreuzberg(error=RuntimeError("extraction failed"))
 
-    with patch.dict("sys.modules", {"kreuzberg": mock_kreuzberg}):
+    with patch.dict("sys.modules", {"kreuzberg": fake_kreuzberg}):
         extractor = KreuzbergExtractor()
         with pytest.raises(RuntimeError, match="extraction failed"):
             extractor.extract(Path("/tmp/test.pdf"))
@@ -168,7 +213,7 @@ def test_backend_selection_creates_correct_extractor_and_reads_file():
     assert isinstance(reader_docling._extractor, DoclingExtractor)
 
     # kreuzberg backend (with kreuzberg mocked as available)
-    with patch.dict("sys.modules", {"kreuzberg": MagicMock()}):
+    with patch.dict("sys.modules", {"kreuzberg": FakeKreuzberg()}):
         reader_kreuzberg = FileReader.from_backend("kreuzberg")
         assert isinstance(reader_kreuzberg._extractor, KreuzbergExtractor)
 
@@ -194,7 +239,7 @@ def test_from_backend_creates_expected_extractor_type(backend_name, expected_typ
     """from_backend() instantiates the correct extractor for each valid name."""
     from file_reader import FileReader
 
-    with patch.dict("sys.modules", {"kreuzberg": MagicMock()}):
+    with patch.dict("sys.modules", {"kreuzberg": FakeKreuzberg()}):
         reader = FileReader.from_backend(backend_name)
     assert type(reader._extractor).__name__ == expected_type
 
@@ -1,8 +1,5 @@
 """Tests for file graph computation."""
-import json
-import pytest
 import numpy as np
-from unittest.mock import MagicMock, patch
 
 
 def make_passage(passage_id, text, file_path, file_name=None):
@@ -84,6 +81,33 @@ class TestSimilarityEdges:
         for e in edges:
             assert e["source"] != e["target"]
 
+    def test_float32_rows_match_float64(self):
+        from graph import compute_similarity_edges
+        matrix = np.zeros((3, 3), dtype=np.float32)
+        matrix[0, 0] = 1.0
+        matrix[1, :2] = [0.9, 0.1]
+        matrix[2, 2] = 1.0
+        embeddings = dict(zip(["a.pdf", "b.pdf", "c.pdf"], matrix))
+        edges = compute_similarity_edges(embeddings, top_k=2, threshold=0.5)
+        expected = compute_similarity_edges(
+            {fid: row.astype(np.float64) for fid, row in embeddings.items()},
+            top_k=2, threshold=0.5,
+        )
+        assert edges == expected
+        assert [(e["source"], e["target"]) for e in edges] == [("a.pdf", "b.pdf")]
+
+    def test_keeps_only_top_k_neighbours(self):
+        from graph import compute_similarity_edges
+        embeddings = {
+            "a.pdf": np.array([1.0, 0.0]),
+            "b.pdf": np.array([0.9, 0.1]),
+            "c.pdf": np.array([0.7, 0.3]),
+        }
+        edges = compute_similarity_edges(embeddings, top_k=1, threshold=0.0)
+        assert [(e["source"], e["target"]) for e in edges] == [
+            ("a.pdf", "b.pdf"), ("c.pdf", "b.pdf"),
+        ]
+
 
 class TestExtractEntities:
     """Test entity extraction from text."""
@@ -145,6 +169,18 @@ class TestReferenceEdges:
         assert len(ref_edges) >= 1
         assert ref_edges[0]["type"] == "reference"
 
+    def test_filename_mentions_ignore_case(self):
+        from graph import compute_reference_edges
+        passages_by_file = {
+            "notes.txt": ["Numbers come from Q3-Budget.XLSX, see there"],
+            "finance/q3-budget.xlsx": ["quarterly numbers"],
+        }
+        file_ids = {"notes.txt", "finance/q3-budget.xlsx"}
+        edges = compute_reference_edges(passages_by_file, file_ids)
+        assert [(e["source"], e["target"], e["label"]) for e in edges] == [
+            ("notes.txt", "finance/q3-budget.xlsx", "mentions q3-budget.xlsx"),
+        ]
+
     def test_no_self_references(self):
         from graph import compute_reference_edges
         passages_by_file = {
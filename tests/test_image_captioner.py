@@ -154,6 +154,44 @@ def test_cached_images_not_recaptioned(MockBuilder):
     assert MockBuilder.return_value.update_index.call_count == 1
 
 
+@patch("image_captioner.LeannBuilder")
+def test_run_returns_number_of_injected_captions(MockBuilder):
+    """run() reports how many captions reached the index: 0 when everything
+    was cached, so the server can skip reloading the searcher."""
+    data_dir = _make_test_dir(images=["a.jpg", "b.png"])
+    captioner, _, _ = _make_captioner(data_dir)
+
+    assert captioner.run() == (2, 0)
+    assert captioner.run() == (0, 0)
+
+
+@patch("image_captioner.LeannBuilder")
+def test_run_reports_failed_captions(MockBuilder):
+    """Images whose captioning raised are reported as failed and stay uncached."""
+    data_dir = _make_test_dir(images=["a.jpg", "b.png"])
+    model = MagicMock()
+    model.caption_image.side_effect = [RuntimeError("vision model missing"), "A caption"]
+    captioner, _, cache = _make_captioner(data_dir, model=model)
+
+    assert captioner.run() == (1, 1)
+    assert cache.get(str(Path(data_dir) / "a.jpg")) is None
+
+
+@patch("image_captioner.LeannBuilder")
+def test_run_reports_failure_when_injection_fails(MockBuilder):
+    """Captions that could not be injected are failed and not cached, so a
+    later run captions and injects them again."""
+    MockBuilder.return_value.update_index.side_effect = RuntimeError("disk full")
+    data_dir = _make_test_dir(images=["a.jpg"])
+    captioner, _, cache = _make_captioner(data_dir)
+
+    assert captioner.run() == (0, 1)
+    assert cache.get(str(Path(data_dir) / "a.jpg")) is None
+
+    MockBuilder.return_value.update_index.side_effect = None
+    assert captioner.run() == (1, 0)
+
+
 # --- US-4: Captioning Progress Visibility ---
 
 # AC-12: Progress messages during captioning
@@ -0,0 +1,37 @@
+"""Tests for deferred imports — heavy modules load on first use, and still resolve."""
+import importlib
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# (module, name) pairs imported inside functions rather than at module top
+DEFERRED_IMPORTS = [
+    ("docling.document_converter", "DocumentConverter"),
+    ("huggingface_hub", "hf_hub_download"),
+    ("graph", "build_file_graph"),
+]
+
+
+def test_server_import_does_not_load_heavy_modules():
+    """Importing server and file_reader leaves docling, huggingface_hub and graph unloaded."""
+    heavy = [module.split(".")[0] for module, _ in DEFERRED_IMPORTS]
+    code = (
+        "import sys, server, file_reader; "
+        f"print([m for m in {heavy!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.parametrize("module,name", DEFERRED_IMPORTS)
+def test_deferred_imports_resolve(module, name):
+    """Each deferred import target exists, so the lazy path cannot break silently."""
+    pytest.importorskip(module.split(".")[0])
+    assert hasattr(importlib.import_module(module), name)
@@ -139,6 +139,12 @@ class TestLoadManifest:
             assert "filename" in model
             assert "repo_id" in model
 
+    def test_returns_independent_copies(self):
+        """The file is read once, but callers get their own dicts."""
+        first = load_manifest()
+        first["models"].clear()
+        assert load_manifest()["models"]
+
 
 class TestModelManagerManifestIntegration:
     """ModelManager resolves paths from manifest, not hardcoded strings."""
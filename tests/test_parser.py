@@ -57,3 +57,10 @@ def test_parse_json_full_planner_schema():
     assert result["keywords"] == ["invoice", "Anthropic"]
     assert result["tool"] == "semantic_search"
     assert result["tool_actions"] == []
+
+
+def test_parse_json_ignores_braces_after_object():
+    """Trailing text with stray braces does not hide the leading object."""
+    raw = 'Result: {"relevant": true, "facts": ["a}"]} then {not json} }}'
+    result = parse_json(raw)
+    assert result == {"relevant": True, "facts": ["a}"]}
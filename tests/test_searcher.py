@@ -2,7 +2,6 @@
 import json
 from dataclasses import dataclass, field
 from pathlib import Path
-from unittest.mock import MagicMock
 from searcher import Searcher, MAP_SYSTEM, extract_keywords
 
 
@@ -24,10 +23,18 @@ class FakeLeann:
         return self.results[:top_k]
 
 
+class FakeModel:
+    def __init__(self, responses):
+        self._responses = iter(responses)
+        self.calls = []
+
+    def generate(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        return next(self._responses)
+
+
 def _make_model(responses):
-    model = MagicMock()
-    model.generate = MagicMock(side_effect=list(responses))
-    return model
+    return FakeModel(responses)
 
 
 def _make_results(*texts, sources=None, scores=None):
@@ -94,7 +101,7 @@ def test_score_prefilter():
     leann = FakeLeann(results)
     searcher = Searcher(leann, model)
     text, sources = searcher.search_and_extract("test")
-    assert model.generate.call_count == 2
+    assert len(model.calls) == 2
 
 
 def test_parse_failure_defaults_to_irrelevant():
@@ -355,3 +362,56 @@ def test_search_and_extract_no_results_returns_empty_sources():
 
     assert sources == []
     assert "No matching" in text
+
+
+def test_repeated_query_served_from_cache():
+    results = _make_results("Budget doc with $450k total")
+    model = _make_model([json.dumps({"facts": ["Total Budget: $450,000"]})])
+    searcher = Searcher(FakeLeann(results), model)
+    first = searcher.search_and_extract("budget")
+    second = searcher.search_and_extract("  Budget ")
+    assert second == first
+    assert len(model.calls) == 1
+
+
+def test_cache_dropped_when_index_reloaded():
+    results = _make_results("Budget doc with $450k total")
+    model = _make_model([
+        json.dumps({"facts": ["Total Budget: $450,000"]}),
+        json.dumps({"facts": ["Total Budget: $500,000"]}),
+    ])
+    searcher = Searcher(FakeLeann(results), model)
+    searcher.search_and_extract("budget")
+    searcher.leann = FakeLeann(results)
+    text, _ = searcher.search_and_extract("budget")
+    assert "$500,000" in text
+    assert len(model.calls) == 2
+
+
+def test_unproductive_search_is_not_cached():
+    """A 'none were relevant' answer is recomputed, so asking again can succeed."""
+    results = _make_results("Budget doc with $450k total")
+    model = _make_model([
+        json.dumps({"facts": []}),
+        json.dumps({"facts": ["Total Budget: $450,000"]}),
+    ])
+    searcher = Searcher(FakeLeann(results), model)
+    text, _ = searcher.search_and_extract("budget")
+    assert "none were relevant" in text
+    text, sources = searcher.search_and_extract("budget")
+    assert "$450,000" in text
+    assert len(model.calls) == 2
+
+
+def test_map_stops_once_keywords_covered():
+    results = _make_results("Budget v1", "Budget v2", "Budget v3")
+    model = _make_model([
+        json.dumps({"facts": ["Budget: $450,000"]}),
+        json.dumps({"facts": ["Revised budget: $500,000"]}),
+        json.dumps({"facts": ["Never reached"]}),
+    ])
+    searcher = Searcher(FakeLeann(results), model)
+    text, sources = searcher.search_and_extract("budget")
+    assert len(model.calls) == 2
+    assert sources == ["file0.txt", "file1.txt"]
+    assert "Never reached" not in text
@@ -2,6 +2,7 @@
 import json
 import io
 import sys
+import time
 from pathlib import Path
 import pytest
 from unittest.mock import MagicMock, patch
@@ -30,6 +31,20 @@ class TestProtocol:
         req = parse_request('{"id": 1}')
         assert req is None
 
+    def test_parse_request_tolerates_surrounding_whitespace(self):
+        from server import parse_request
+        req = parse_request('  {"id": 3, "method": "ping"}\r\n')
+        assert req == {"id": 3, "method": "ping"}
+
+    def test_parse_request_accepts_bytes(self):
+        from server import parse_request
+        assert parse_request(b'{"id": 4, "method": "ping"}\n') == {"id": 4, "method": "ping"}
+        assert parse_request(b"\xff\xfe") is None
+
+    def test_parse_non_object_request(self):
+        from server import parse_request
+        assert parse_request('["ping"]') is None
+
     def test_format_result(self):
         from server import format_response
         line = format_response(1, "result", {"status": "ok"})
@@ -44,6 +59,17 @@ class TestProtocol:
         assert parsed["type"] == "token"
         assert parsed["data"]["text"] == "hello"
 
+    def test_encode_token_fast_path_matches_generic_encoding(self):
+        from server import encode_response
+        for req_id, data in [
+            (2, {"text": "hi \"there\"\n\u00e9\U0001f600"}),
+            (3, {"text": "x", "directoryId": "docs"}),
+            (None, {"text": "x"}),
+        ]:
+            line = encode_response(req_id, "token", data)
+            assert line.endswith(b"\n")
+            assert json.loads(line) == {"id": req_id, "type": "token", "data": data}
+
     def test_format_error(self):
         from server import format_response
         line = format_response(None, "error", {"message": "boom"})
@@ -52,6 +78,164 @@ class TestProtocol:
         assert parsed["type"] == "error"
 
 
+class TestSend:
+    """Test NDJSON output through send()."""
+
+    def test_send_writes_one_line_to_protocol_stream(self, monkeypatch):
+        import server as srv_mod
+        out = io.BytesIO()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        srv_mod.send(5, "token", {"text": "hi"})
+        srv_mod.send(None, "status", {"state": "ready"})
+        lines = out.getvalue().split(b"\n")
+        assert lines[-1] == b""
+        assert json.loads(lines[0]) == {"id": 5, "type": "token", "data": {"text": "hi"}}
+        assert json.loads(lines[1])["data"] == {"state": "ready"}
+
+    def test_send_coalesces_token_flushes(self, monkeypatch):
+        import server as srv_mod
+
+        class CountingStream(io.BytesIO):
+            flushes = 0
+
+            def flush(self):
+                self.flushes += 1
+
+        out = CountingStream()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        monkeypatch.setattr(srv_mod, "_TOKEN_FLUSH_INTERVAL", 60.0)
+        monkeypatch.setattr(srv_mod, "_TOKEN_FLUSH_BYTES", 200)
+        srv_mod.send(None, "status", {"state": "ready"})
+        assert out.flushes == 1
+
+        for _ in range(3):
+            srv_mod.send(1, "token", {"text": "x"})
+        assert out.flushes == 1  # held back: under the byte and time limits
+        srv_mod.send(1, "token", {"text": "y" * 200})
+        assert out.flushes == 2  # byte limit reached
+        srv_mod.send(1, "token", {"text": "z"})
+        srv_mod.send(1, "result", {"text": "xxxz"})
+        assert out.flushes == 3  # non-token messages always flush
+        assert len(out.getvalue().splitlines()) == 7
+
+    def test_send_flushes_a_lone_buffered_token_within_the_interval(self, monkeypatch):
+        import threading
+        import server as srv_mod
+
+        class SignallingStream(io.BytesIO):
+            flushes = 0
+            flushed = threading.Event()
+
+            def flush(self):
+                self.flushes += 1
+                self.flushed.set()
+
+        out = SignallingStream()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        monkeypatch.setattr(srv_mod, "_TOKEN_FLUSH_INTERVAL", 0.05)
+        srv_mod.send(None, "status", {"state": "ready"})
+        out.flushed.clear()
+
+        start = time.monotonic()
+        srv_mod.send(1, "token", {"text": "x"})
+        assert out.flushes == 1  # buffered: well inside the interval
+        assert out.flushed.wait(timeout=2)  # no further send() needed
+        assert out.flushes == 2
+        assert time.monotonic() - start < 1.0
+
+    def test_run_writes_results_through_send(self, monkeypatch):
+        import server as srv_mod
+        out = io.BytesIO()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        srv = srv_mod.Server()
+        stream = io.StringIO(make_request("ping") + "\n" + make_request("shutdown", req_id=2) + "\n")
+        srv.run(stream)
+        responses = [json.loads(l) for l in out.getvalue().splitlines()]
+        assert [r["id"] for r in responses] == [1, 2]
+        assert responses[1]["data"]["status"] == "shutting_down"
+
+    def test_run_reads_binary_stdin(self, monkeypatch):
+        import server as srv_mod
+        out = io.BytesIO()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        srv = srv_mod.Server()
+        stream = io.BytesIO((make_request("ping") + "\n\n" + make_request("shutdown", req_id=2) + "\n").encode())
+        srv.run(stream)
+        assert [json.loads(l)["id"] for l in out.getvalue().splitlines()] == [1, 2]
+
+    def test_run_answers_ping_while_query_is_running(self, monkeypatch):
+        import threading
+        import server as srv_mod
+        out = io.BytesIO()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        srv = srv_mod.Server()
+        release = threading.Event()
+
+        def slow_query(req_id, params):
+            release.wait(timeout=5)
+            return {"id": req_id, "type": "result", "data": {"text": "done"}}
+
+        srv._handlers["query"] = slow_query
+
+        def lines():
+            yield make_request("query", {"text": "q"}, req_id=1)
+            yield make_request("ping", req_id=2)
+            assert out.getvalue().count(b"\n") == 1, "ping blocked behind query"
+            release.set()
+            yield make_request("shutdown", req_id=3)
+
+        srv.run(lines())
+        ids = [json.loads(l)["id"] for l in out.getvalue().splitlines()]
+        assert ids == [2, 1, 3]
+
+
+    def test_run_answers_ping_and_query_behind_queued_inits(self, monkeypatch):
+        """Inits queue on their own worker; ping and queries do not wait for them."""
+        import threading
+        import server as srv_mod
+        out = io.BytesIO()
+        monkeypatch.setattr(srv_mod, "_protocol_out", out)
+        srv = srv_mod.Server()
+        release = threading.Event()
+        query_answered = threading.Event()
+
+        def slow_init(req_id, params):
+            release.wait(timeout=5)
+            return {"id": req_id, "type": "result", "data": {"status": "ready"}}
+
+        def query(req_id, params):
+            return {"id": req_id, "type": "result", "data": {"text": "done"}}
+
+        srv._handlers["init"] = slow_init
+        srv._handlers["query"] = query
+        original_emit = srv._emit_result
+
+        def emit(future):
+            original_emit(future)
+            if future.result()["id"] == 7:
+                query_answered.set()
+
+        srv._emit_result = emit
+
+        def answered():
+            return [json.loads(l)["id"] for l in out.getvalue().splitlines()]
+
+        def lines():
+            for i in range(1, 6):
+                yield make_request("init", {"dataDir": f"/tmp/d{i}"}, req_id=i)
+            yield make_request("ping", req_id=6)
+            assert answered() == [6], "ping queued behind inits"
+            yield make_request("query", {"text": "q"}, req_id=7)
+            assert query_answered.wait(timeout=5), "query queued behind inits"
+            release.set()
+            yield make_request("shutdown", req_id=8)
+
+        srv.run(lines())
+        ids = answered()
+        assert ids[:2] == [6, 7]
+        assert ids[2:7] == [1, 2, 3, 4, 5]
+        assert ids[-1] == 8
+
 class TestPing:
     """Test the ping/health check method."""
 
@@ -146,6 +330,88 @@ class TestQueryStreaming:
             srv_mod.send = original_send
 
 
+class TestConversationHistory:
+    """Test per-directory conversation memory."""
+
+    def test_history_keeps_last_ten_messages(self):
+        from collections import deque
+        from server import Server
+        import server as srv_mod
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+
+        try:
+            srv = Server()
+            srv.state = "ready"
+            mock_agent = MagicMock()
+            mock_agent.run.return_value = ("answer", [])
+            history = deque(maxlen=10)
+            srv.directories["test"] = {
+                "agent": mock_agent,
+                "conversation_history": history,
+                "state": "ready",
+                "dir_id": "test",
+                "path": "/tmp/test",
+            }
+
+            for i in range(7):
+                srv.handle_query(i, {"text": f"q{i}", "directoryId": "test"})
+
+            assert len(history) == 10
+            assert history[0] == {"role": "user", "content": "q2"}
+            passed = mock_agent.run.call_args.kwargs["history"]
+            assert isinstance(passed, list)
+            assert passed[-1] == {"role": "assistant", "content": "answer"}
+        finally:
+            srv_mod.send = original_send
+
+
+    def test_concurrent_queries_keep_history_pairs_together(self):
+        """Queries on one directory run one at a time, so each user turn is
+        followed by its own answer."""
+        import threading
+        from server import Server
+        import server as srv_mod
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+
+        try:
+            srv = Server()
+            srv.state = "ready"
+            started = threading.Event()
+            release = threading.Event()
+
+            def run(query, history=None, on_token=None, on_step=None):
+                started.set()
+                release.wait(timeout=5)
+                return f"answer {query}", []
+
+            mock_agent = MagicMock()
+            mock_agent.run.side_effect = run
+            srv.directories["test"] = {
+                "agent": mock_agent,
+                "conversation_history": [],
+                "state": "ready",
+                "dir_id": "test",
+                "path": "/tmp/test",
+            }
+
+            first = threading.Thread(target=srv.handle_query, args=(1, {"text": "q1", "directoryId": "test"}))
+            first.start()
+            assert started.wait(timeout=5)
+            second = threading.Thread(target=srv.handle_query, args=(2, {"text": "q2", "directoryId": "test"}))
+            second.start()
+            second.join(timeout=0.1)
+            assert mock_agent.run.call_count == 1
+            release.set()
+            first.join(timeout=5)
+            second.join(timeout=5)
+
+            history = srv.directories["test"]["conversation_history"]
+            assert [m["content"] for m in history] == ["q1", "answer q1", "q2", "answer q2"]
+        finally:
+            srv_mod.send = original_send
+
 class TestShutdown:
     """Test clean shutdown."""
 
@@ -174,6 +440,10 @@ class TestMultiDirectoryInit:
         from server import make_dir_id
         assert make_dir_id("/home/user/my documents") == "my_documents"
 
+    def test_make_dir_id_ignores_trailing_separator(self):
+        from server import make_dir_id
+        assert make_dir_id("/home/user/my documents/") == "my_documents"
+
     def test_no_old_attributes(self):
         from server import Server
         srv = Server()
@@ -184,6 +454,31 @@ class TestMultiDirectoryInit:
         assert not hasattr(srv, "conversation_history")
 
 
+class TestSensitiveDirectory:
+    """Test the sensitive-directory guard used by init."""
+
+    def test_system_dirs_are_sensitive(self):
+        from server import _is_sensitive_directory
+        assert _is_sensitive_directory(Path("/etc"))
+        assert _is_sensitive_directory(Path("/etc/ssh"))
+
+    def test_home_dirs_are_sensitive(self):
+        from server import _is_sensitive_directory
+        assert _is_sensitive_directory(Path.home() / ".ssh")
+        assert _is_sensitive_directory(Path.home() / ".aws" / "credentials")
+
+    def test_prefix_must_end_at_path_boundary(self):
+        from server import _is_sensitive_directory
+        assert not _is_sensitive_directory(Path("/etcetera"))
+        assert not _is_sensitive_directory(Path.home() / ".sshkeys-backup")
+        assert not _is_sensitive_directory(Path.home() / "Documents")
+
+    def test_unrelated_top_level_dir_is_not_sensitive(self):
+        from server import _is_sensitive_directory
+        assert not _is_sensitive_directory(Path("/mnt/data/etc"))
+        assert not _is_sensitive_directory(Path("/"))
+
+
 class TestQueryRouting:
     """Test directoryId routing in queries."""
 
@@ -281,6 +576,57 @@ class TestRemoveDirectory:
         assert srv.state == "not_initialized"
 
 
+    def test_remove_waits_for_in_flight_query(self):
+        """Index files are not deleted while a query is searching them."""
+        import threading
+        from server import Server
+        import server as srv_mod
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+
+        try:
+            srv = Server()
+            srv.state = "ready"
+            started = threading.Event()
+            release = threading.Event()
+            deleted = []
+
+            def run(query, history=None, on_token=None, on_step=None):
+                started.set()
+                release.wait(timeout=5)
+                return "answer", []
+
+            mock_agent = MagicMock()
+            mock_agent.run.side_effect = run
+            srv.directories["test"] = {
+                "agent": mock_agent,
+                "conversation_history": [],
+                "state": "ready",
+                "dir_id": "test",
+                "path": "/tmp/test",
+            }
+            srv._delete_index_files = lambda entry: deleted.append(entry["dir_id"])
+
+            results = {}
+            query = threading.Thread(target=lambda: results.setdefault(
+                "query", srv.handle_query(1, {"text": "q", "directoryId": "test"})))
+            query.start()
+            assert started.wait(timeout=5)
+            remove = threading.Thread(target=lambda: results.setdefault(
+                "remove", srv.handle_remove_directory(2, {"directoryId": "test"})))
+            remove.start()
+            remove.join(timeout=0.1)
+            assert deleted == []
+            release.set()
+            query.join(timeout=5)
+            remove.join(timeout=5)
+
+            assert results["query"]["type"] == "result"
+            assert results["remove"]["data"]["status"] == "ok"
+            assert deleted == ["test"]
+        finally:
+            srv_mod.send = original_send
+
 class TestDirectorySummary:
     """Test summary generation."""
 
@@ -322,6 +668,35 @@ class TestDirectorySummary:
         summary = srv._generate_summary("nonexistent")
         assert summary == ""
 
+    def test_init_reuses_summary_until_index_changes(self, tmp_path):
+        from server import Server
+        import server as srv_mod
+
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+        try:
+            index_dir = tmp_path / "index"
+            index_dir.mkdir()
+            (index_dir / "documents.leann.passages.jsonl").write_text("{}\n")
+            data_dir = tmp_path / "docs"
+            data_dir.mkdir()
+            srv = Server()
+            srv.model = MagicMock()
+            srv.model.generate.return_value = "About docs."
+
+            with _make_init_context(data_dir, MagicMock(), MagicMock(), MagicMock()), \
+                 patch("chat.find_index_path", return_value=str(index_dir / "documents.leann")):
+                srv.handle_init(1, {"dataDir": str(data_dir)})
+                srv.handle_init(2, {"dataDir": str(data_dir)})
+                assert srv.model.generate.call_count == 1
+                assert srv.directories["docs"]["summary"] == "About docs."
+
+                (index_dir / "documents.leann.passages.jsonl").write_text("{}\n{}\n")
+                srv.handle_init(3, {"dataDir": str(data_dir)})
+                assert srv.model.generate.call_count == 2
+        finally:
+            srv_mod.send = original_send
+
 
 class TestCollectStats:
     """Test directory stat collection."""
@@ -371,6 +746,127 @@ class TestCollectStats:
         assert stats["dirs"]["count"] == 2
         assert stats["dirs"]["maxDepth"] == 2
 
+    def test_collect_stats_extension_rules(self, tmp_path):
+        from server import Server
+        srv = Server()
+        (tmp_path / "Photo.JPG").write_bytes(b"x" * 10)
+        (tmp_path / "archive.tar.gz").write_bytes(b"x" * 20)
+        (tmp_path / ".bashrc").write_text("alias")
+        (tmp_path / "trailing.").write_text("dot")
+
+        stats = srv._collect_stats(tmp_path)
+        assert stats["fileCount"] == 4
+        assert stats["types"] == {"jpg": 1, "gz": 1}
+        assert stats["sizeByType"] == {"jpg": 10, "gz": 20}
+        assert type(stats["types"]) is dict
+
+    def test_collect_stats_skips_symlinks(self, tmp_path):
+        from server import Server
+        srv = Server()
+        (tmp_path / "real.txt").write_text("hello")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "link.txt").symlink_to(tmp_path / "real.txt")
+        (tmp_path / "link_dir").symlink_to(tmp_path / "sub", target_is_directory=True)
+
+        stats = srv._collect_stats(tmp_path)
+        assert stats["fileCount"] == 1
+        assert stats["dirs"]["count"] == 1
+        assert stats["largestFiles"] == [{"name": "real.txt", "size": 5}]
+
+    def test_collect_stats_merges_subtrees(self, tmp_path):
+        from server import Server
+        srv = Server()
+        (tmp_path / "top.txt").write_bytes(b"x" * 50)
+        for i, size in enumerate([400, 300, 200, 100]):
+            sub = tmp_path / f"sub{i}"
+            sub.mkdir()
+            (sub / f"f{i}.txt").write_bytes(b"x" * size)
+        (tmp_path / "sub0" / "nested").mkdir()
+        (tmp_path / "sub0" / "nested" / "n.md").write_text("hi")
+
+        stats = srv._collect_stats(tmp_path)
+        assert stats["fileCount"] == 6
+        assert stats["types"] == {"txt": 5, "md": 1}
+        assert stats["sizeByType"]["txt"] == 1050
+        assert stats["dirs"] == {"count": 5, "maxDepth": 2}
+        assert [f["name"] for f in stats["largestFiles"]] == ["f0.txt", "f1.txt", "f2.txt"]
+
+    def test_collect_stats_handles_trees_deeper_than_recursion_limit(self, tmp_path):
+        from server import Server
+        deepest = tmp_path
+        for _ in range(150):
+            deepest = deepest / "d"
+        deepest.mkdir(parents=True)
+        (deepest / "leaf.txt").write_text("x")
+        srv = Server()
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            stats = srv._collect_stats(tmp_path)
+        finally:
+            sys.setrecursionlimit(limit)
+        assert stats["fileCount"] == 1
+        assert stats["dirs"] == {"count": 150, "maxDepth": 150}
+
+    def test_image_fingerprint_tracks_image_changes(self, tmp_path):
+        import os
+        from server import Server
+        srv = Server()
+        (tmp_path / "doc.txt").write_text("hello")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "a.jpg").write_bytes(b"\xff\xd8")
+
+        fp = srv._image_fingerprint(srv._walk_directory(tmp_path))
+        assert fp[0] == 1
+        assert srv._image_fingerprint(srv._walk_directory(tmp_path)) == fp
+
+        (tmp_path / "notes.md").write_text("not an image")
+        assert srv._image_fingerprint(srv._walk_directory(tmp_path)) == fp
+
+        os.rename(tmp_path / "sub" / "a.jpg", tmp_path / "sub" / "b.jpg")
+        assert srv._image_fingerprint(srv._walk_directory(tmp_path)) != fp
+
+
+class TestListIndexes:
+    """Test the list_indexes TTL cache."""
+
+    def test_list_indexes_reuses_recent_scan(self, tmp_path, monkeypatch):
+        from server import Server
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Path, "home", lambda: tmp_path / "home")
+        (tmp_path / ".leann" / "indexes" / "b_idx").mkdir(parents=True)
+        (tmp_path / ".leann" / "indexes" / "a_idx").mkdir()
+        srv = Server()
+
+        assert srv.handle_list_indexes(1)["data"]["indexes"] == ["a_idx", "b_idx"]
+        (tmp_path / ".leann" / "indexes" / "c_idx").mkdir()
+        assert srv.handle_list_indexes(2)["data"]["indexes"] == ["a_idx", "b_idx"]
+
+        srv._delete_index_files({})  # building or deleting an index resets the cache
+        assert srv.handle_list_indexes(3)["data"]["indexes"] == ["a_idx", "b_idx", "c_idx"]
+
+
+class TestDeleteIndexFiles:
+    """Test on-disk cleanup for a directory entry."""
+
+    def test_uses_stored_index_path(self, tmp_path):
+        """The path resolved at init is reused instead of searching again."""
+        from server import Server
+        index_dir = tmp_path / "indexes" / "docs_idx"
+        index_dir.mkdir(parents=True)
+        (index_dir / "documents.leann.meta.json").write_text("{}")
+        srv = Server()
+
+        with patch("chat.find_index_path") as find:
+            srv._delete_index_files({
+                "index_name": "docs_idx",
+                "index_path": str(index_dir / "documents.leann"),
+            })
+
+        find.assert_not_called()
+        assert not index_dir.exists()
+
 
 class TestMultiDirectoryFlow:
     """Test that dispatch routes all new methods."""
@@ -401,6 +897,22 @@ class TestMultiDirectoryFlow:
         assert result["type"] == "error"
         assert "Unknown method" in result["data"]["message"]
 
+    def test_dispatch_method_without_params(self):
+        from server import Server
+        srv = Server()
+        result = srv.dispatch({"id": 7, "method": "ping"})
+        assert result["id"] == 7
+        assert result["data"]["state"] == "not_initialized"
+
+    def test_dispatch_handler_error_is_reported(self):
+        from server import Server
+        srv = Server()
+        srv.handle_ping = MagicMock(side_effect=RuntimeError("boom"))
+        srv._handlers["ping"] = srv.handle_ping
+        result = srv.dispatch({"id": 1, "method": "ping"})
+        assert result["type"] == "error"
+        assert result["data"]["message"] == "Internal server error"
+
 
 class TestCheckModels:
     """Acceptance: check_models returns per-model present/missing status."""
@@ -520,7 +1032,7 @@ class TestDownloadModels:
                 return str(Path(local_dir) / filename)
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download", side_effect=fake_download), \
+                 patch("huggingface_hub.hf_hub_download", side_effect=fake_download), \
                  patch("server.get_models_dir", return_value=tmp_path):
                 result = srv.dispatch({
                     "id": 2,
@@ -567,7 +1079,7 @@ class TestDownloadModels:
             (tmp_path / "text.gguf").write_bytes(b"\x00" * 1024)
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download") as mock_dl, \
+                 patch("huggingface_hub.hf_hub_download") as mock_dl, \
                  patch("server.get_models_dir", return_value=tmp_path):
                 result = srv.dispatch({
                     "id": 2,
@@ -604,7 +1116,7 @@ class TestDownloadModels:
             }
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download",
+                 patch("huggingface_hub.hf_hub_download",
                        side_effect=OSError("Network error")), \
                  patch("server.get_models_dir", return_value=tmp_path):
                 result = srv.dispatch({
@@ -628,6 +1140,51 @@ class TestDownloadModels:
         finally:
             srv_mod.send = original_send
 
+    def test_download_models_downloads_missing_concurrently(self, tmp_path):
+        """Missing models download in parallel; one failure does not cancel the rest."""
+        import threading
+        from server import Server
+        import server as srv_mod
+
+        sent = []
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: sent.append(
+            {"id": rid, "type": rtype, "data": data}
+        )
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fake_download(repo_id, filename, local_dir):
+            barrier.wait()  # both downloads must be in flight at once
+            if filename == "bad.gguf":
+                raise OSError("Network error")
+            return str(Path(local_dir) / filename)
+
+        try:
+            srv = Server()
+            manifest = {
+                "version": 1,
+                "models": [
+                    {"id": "bad-model", "filename": "bad.gguf",
+                     "repo_id": "test/repo", "required": True},
+                    {"id": "good-model", "filename": "good.gguf",
+                     "repo_id": "test/repo", "required": True},
+                ],
+            }
+
+            with patch("server.load_manifest", return_value=manifest), \
+                 patch("huggingface_hub.hf_hub_download", side_effect=fake_download), \
+                 patch("server.get_models_dir", return_value=tmp_path):
+                result = srv.handle_download_models(3, {})
+
+            assert result["type"] == "error"
+            assert "bad-model" in result["data"]["message"]
+            statuses = {(m["data"]["model_id"], m["data"]["status"])
+                        for m in sent if m["type"] == "setup_progress"}
+            assert ("good-model", "complete") in statuses
+            assert ("bad-model", "error") in statuses
+        finally:
+            srv_mod.send = original_send
+
 
 class TestGetFileGraph:
     """Test file graph handler."""
@@ -664,7 +1221,7 @@ class TestGetFileGraph:
             "path": "/tmp/test",
             "searcher": mock_searcher,
         }
-        with patch("server.build_file_graph") as mock_build:
+        with patch("graph.build_file_graph") as mock_build:
             mock_build.return_value = {
                 "nodes": [{"id": "a.pdf", "name": "a.pdf", "type": "pdf", "size": 100, "dir": "", "passageCount": 3}],
                 "edges": [{"source": "a.pdf", "target": "b.pdf", "type": "similarity", "weight": 0.8}],
@@ -688,11 +1245,42 @@ class TestGetFileGraph:
             "searcher": MagicMock(),
             "file_graph": cached_graph,
         }
-        with patch("server.build_file_graph") as mock_build:
+        with patch("graph.build_file_graph") as mock_build:
             result = srv.handle_get_file_graph(1, {"directoryId": "test"})
             assert result["type"] == "result"
             mock_build.assert_not_called()
 
+    def test_get_file_graph_persists_until_index_changes(self, tmp_path):
+        """A graph cached on disk is reused by a new server until the index changes."""
+        from server import Server
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        (index_dir / "documents.leann.passages.jsonl").write_text("{}\n")
+        data_dir = tmp_path / "docs"
+        data_dir.mkdir()
+
+        def make_server():
+            srv = Server()
+            srv.state = "ready"
+            srv.directories["test"] = {
+                "dir_id": "test",
+                "state": "ready",
+                "path": str(data_dir),
+                "index_path": str(index_dir / "documents.leann"),
+                "searcher": MagicMock(),
+            }
+            return srv
+
+        graph = {"nodes": [{"id": "a.pdf"}], "edges": []}
+        with patch("graph.build_file_graph", return_value=graph) as mock_build:
+            assert make_server().handle_get_file_graph(1, {"directoryId": "test"})["data"] == graph
+            assert make_server().handle_get_file_graph(2, {"directoryId": "test"})["data"] == graph
+            assert mock_build.call_count == 1
+
+            (index_dir / "documents.leann.passages.jsonl").write_text("{}\n{}\n")
+            make_server().handle_get_file_graph(3, {"directoryId": "test"})
+            assert mock_build.call_count == 2
+
     def test_dispatch_routes_get_file_graph(self):
         from server import Server
         srv = Server()
@@ -703,7 +1291,7 @@ class TestGetFileGraph:
             "path": "/tmp/test",
             "searcher": MagicMock(),
         }
-        with patch("server.build_file_graph") as mock_build:
+        with patch("graph.build_file_graph") as mock_build:
             mock_build.return_value = {"nodes": [], "edges": []}
             result = srv.dispatch({"id": 1, "method": "getFileGraph", "params": {"directoryId": "test"}})
             assert result["type"] == "result"
@@ -744,7 +1332,7 @@ class TestQuerySources:
             srv_mod.send = original_send
 
     def test_query_resolves_nested_source(self, tmp_path):
-        """Sources in subdirectories are found via os.walk."""
+        """Sources in subdirectories are found via the basename index."""
         from server import Server
         import server as srv_mod
         original_send = srv_mod.send
@@ -773,6 +1361,35 @@ class TestQuerySources:
         finally:
             srv_mod.send = original_send
 
+    def test_query_uses_prebuilt_basename_index(self, tmp_path):
+        """Sources missing from the directory root are looked up in the basename index."""
+        from server import Server
+        import server as srv_mod
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+
+        try:
+            srv = Server()
+            srv.state = "ready"
+
+            mock_agent = MagicMock()
+            mock_agent.run.return_value = ("indexed", ["deep.pdf"])
+            srv.directories["test"] = {
+                "agent": mock_agent,
+                "conversation_history": [],
+                "state": "ready",
+                "dir_id": "test",
+                "path": str(tmp_path),
+                "basename_index": {"deep.pdf": ["/indexed/sub/deep.pdf"]},
+            }
+
+            with patch.object(srv, "_walk_directory") as mock_walk:
+                result = srv.handle_query(1, {"text": "find deep", "directoryId": "test"})
+            mock_walk.assert_not_called()
+            assert result["data"]["sources"] == ["/indexed/sub/deep.pdf"]
+        finally:
+            srv_mod.send = original_send
+
     def test_query_unresolvable_source_fallback(self):
         """Sources that can't be found on disk fall back to the bare name."""
         from server import Server
@@ -831,6 +1448,91 @@ class TestQuerySources:
         finally:
             srv_mod.send = original_send
 
+    def test_query_all_runs_directories_concurrently_in_order(self):
+        """_query_all overlaps directories, keeps their order, and tags tokens."""
+        import threading
+        from server import Server
+        import server as srv_mod
+        sent = []
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: sent.append((rtype, data))
+
+        try:
+            srv = Server()
+            srv.state = "ready"
+            barrier = threading.Barrier(2, timeout=5)
+
+            def make_agent(name):
+                def run(query, history=None, on_token=None):
+                    barrier.wait()  # both directories must be in flight at once
+                    on_token(name)
+                    return name, []
+                agent = MagicMock()
+                agent.run.side_effect = run
+                return agent
+
+            for name in ("d1", "d2"):
+                srv.directories[name] = {
+                    "agent": make_agent(name),
+                    "conversation_history": [],
+                    "state": "ready",
+                    "dir_id": name,
+                    "path": "/tmp/empty_dir_unlikely_to_exist",
+                    "basename_index": {},
+                }
+
+            result = srv._query_all(1, "q")
+            assert [r["directoryId"] for r in result["data"]["results"]] == ["d1", "d2"]
+            assert [r["text"] for r in result["data"]["results"]] == ["d1", "d2"]
+            tokens = sorted(d["directoryId"] for t, d in sent if t == "token")
+            assert tokens == ["d1", "d2"]
+        finally:
+            srv_mod.send = original_send
+
+
+    def test_query_all_streams_tokens_one_directory_at_a_time(self):
+        """Tokens from a later directory are held until earlier ones finish."""
+        import threading
+        from server import Server
+        import server as srv_mod
+        sent = []
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: sent.append((rtype, data))
+
+        try:
+            srv = Server()
+            srv.state = "ready"
+            d2_done = threading.Event()
+
+            def run_d1(query, history=None, on_token=None):
+                assert d2_done.wait(timeout=5)  # d2 streams and finishes first
+                for text in ("a1", "a2"):
+                    on_token(text)
+                return "a", []
+
+            def run_d2(query, history=None, on_token=None):
+                for text in ("b1", "b2"):
+                    on_token(text)
+                d2_done.set()
+                return "b", []
+
+            for name, run in (("d1", run_d1), ("d2", run_d2)):
+                agent = MagicMock()
+                agent.run.side_effect = run
+                srv.directories[name] = {
+                    "agent": agent,
+                    "conversation_history": [],
+                    "state": "ready",
+                    "dir_id": name,
+                    "path": "/tmp/empty_dir_unlikely_to_exist",
+                    "basename_index": {},
+                }
+
+            srv._query_all(1, "q")
+            tokens = [(d["directoryId"], d["text"]) for t, d in sent if t == "token"]
+            assert tokens == [("d1", "a1"), ("d1", "a2"), ("d2", "b1"), ("d2", "b2")]
+        finally:
+            srv_mod.send = original_send
 
 def _init_patches():
     """Return a dict of patch targets for handle_init's local imports."""
@@ -909,7 +1611,7 @@ class TestSetupFlowIntegration:
                 return str(Path(local_dir) / filename)
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download", side_effect=fake_download), \
+                 patch("huggingface_hub.hf_hub_download", side_effect=fake_download), \
                  patch("server.get_models_dir", return_value=tmp_path):
 
                 # Step 1: check_models on empty dir -> not ready
@@ -979,7 +1681,7 @@ class TestSetupFlowIntegration:
                     raise OSError("Connection lost")
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download", side_effect=fail_on_second), \
+                 patch("huggingface_hub.hf_hub_download", side_effect=fail_on_second), \
                  patch("server.get_models_dir", return_value=tmp_path):
                 r1 = srv.dispatch({
                     "id": 1, "method": "download_models",
@@ -1003,7 +1705,7 @@ class TestSetupFlowIntegration:
                 return str(Path(local_dir) / filename)
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download", side_effect=track_download), \
+                 patch("huggingface_hub.hf_hub_download", side_effect=track_download), \
                  patch("server.get_models_dir", return_value=tmp_path):
                 r2 = srv.dispatch({
                     "id": 2, "method": "download_models",
@@ -1078,7 +1780,7 @@ class TestSetupFlowIntegration:
                 raise RuntimeError("No network available - should not be called")
 
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download",
+                 patch("huggingface_hub.hf_hub_download",
                        side_effect=network_should_not_be_called), \
                  patch("server.get_models_dir", return_value=tmp_path):
                 # check_models should work purely from disk
@@ -1092,7 +1794,7 @@ class TestSetupFlowIntegration:
 
             # download_models with all present should also not call network
             with patch("server.load_manifest", return_value=manifest), \
-                 patch("server.hf_hub_download",
+                 patch("huggingface_hub.hf_hub_download",
                        side_effect=network_should_not_be_called), \
                  patch("server.get_models_dir", return_value=tmp_path):
                 result2 = srv.dispatch({
@@ -1155,6 +1857,81 @@ class TestEagerVisionLoading:
             srv_mod.send = original_send
 
 
+class TestInitStatsWalk:
+    """The init stats walk overlaps the index build."""
+
+    def test_walk_runs_while_index_builds(self, tmp_path):
+        import threading
+        from server import Server
+        import server as srv_mod
+
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+        try:
+            srv = Server()
+            srv.model = MagicMock()
+            (tmp_path / "doc.txt").write_text("hello")
+            walked = threading.Event()
+            original_walk = srv._walk_directory
+
+            def walk(data_dir):
+                walked.set()
+                return original_walk(data_dir)
+
+            srv._walk_directory = walk
+
+            def build_index(data_dir):
+                assert walked.wait(timeout=5), "walk did not start before the build finished"
+                return "test_index"
+
+            with _make_init_context(tmp_path, MagicMock(), MagicMock(), MagicMock()), \
+                 patch("chat.build_index", side_effect=build_index):
+                result = srv.handle_init(1, {"dataDir": str(tmp_path)})
+
+            assert result["data"]["status"] == "ready"
+            assert srv.directories[result["data"]["directoryId"]]["stats"]["fileCount"] == 1
+        finally:
+            srv_mod.send = original_send
+
+
+class TestSearcherReuse:
+    """A warmed LeannSearcher is reused while its index is unchanged."""
+
+    def test_reinit_reuses_searcher_until_index_changes(self, tmp_path):
+        from server import Server
+        import server as srv_mod
+
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+        try:
+            index_dir = tmp_path / "index"
+            index_dir.mkdir()
+            (index_dir / "documents.leann.passages.jsonl").write_text("{}\n")
+            data_dir = tmp_path / "docs"
+            data_dir.mkdir()
+            srv = Server()
+            srv.model = MagicMock()
+            captioner = MagicMock()
+            captioner.run.return_value = (0, 0)
+            leann_cls = MagicMock()
+
+            with _make_init_context(data_dir, MagicMock(), MagicMock(return_value=captioner), MagicMock()), \
+                 patch("chat.find_index_path", return_value=str(index_dir / "documents.leann")), \
+                 patch("leann.LeannSearcher", leann_cls):
+                srv.handle_init(1, {"dataDir": str(data_dir)})
+                srv.handle_init(2, {"dataDir": str(data_dir)})
+                assert leann_cls.call_count == 1
+
+                (index_dir / "documents.leann.passages.jsonl").write_text("{}\n{}\n")
+                srv.handle_init(3, {"dataDir": str(data_dir)})
+                assert leann_cls.call_count == 2
+
+                srv.handle_remove_directory(4, {"directoryId": "docs"})
+                assert srv._leann_searchers == {}
+        finally:
+            srv_mod.send = original_send
+
+
 class TestForegroundCaptioning:
     """Acceptance: handle_init runs summary + captioning inline (no background thread)."""
 
@@ -1261,6 +2038,63 @@ class TestForegroundCaptioning:
         finally:
             srv_mod.send = original_send
 
+    def test_handle_init_skips_captioning_when_images_unchanged(self, tmp_path):
+        """A second init with the same images does not run the captioner again."""
+        from server import Server
+        import server as srv_mod
+
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+
+        try:
+            srv = Server()
+            srv.model = MagicMock()
+            (tmp_path / "photo.jpg").write_bytes(b"\xff\xd8\xff\xe0")
+
+            mock_captioner = MagicMock()
+            mock_captioner.run.return_value = (0, 0)
+            mock_captioner_cls = MagicMock(return_value=mock_captioner)
+
+            with _make_init_context(tmp_path, MagicMock(),
+                                    mock_captioner_cls, MagicMock()):
+                srv.handle_init(1, {"dataDir": str(tmp_path)})
+                srv.handle_init(2, {"dataDir": str(tmp_path)})
+                assert mock_captioner.run.call_count == 1
+
+                (tmp_path / "new.png").write_bytes(b"\x89PNG")
+                srv.handle_init(3, {"dataDir": str(tmp_path)})
+                assert mock_captioner.run.call_count == 2
+
+            assert (tmp_path / ".neurofind" / "caption_fingerprint.json").exists()
+        finally:
+            srv_mod.send = original_send
+
+    def test_handle_init_retries_captioning_after_failures(self, tmp_path):
+        """A pass where captioning failed does not record the images as done."""
+        from server import Server
+        import server as srv_mod
+
+        original_send = srv_mod.send
+        srv_mod.send = lambda rid, rtype, data: None
+
+        try:
+            srv = Server()
+            srv.model = MagicMock()
+            srv.model.caption_image.side_effect = RuntimeError("vision model missing")
+            (tmp_path / "photo.jpg").write_bytes(b"\xff\xd8\xff\xe0")
+
+            with _make_init_context(tmp_path, MagicMock()), \
+                 patch("image_captioner.ImageCaptioner._load_image_as_data_uri",
+                       return_value="data:image/jpeg;base64,/9j/fake"), \
+                 patch("image_captioner.LeannBuilder"):
+                srv.handle_init(1, {"dataDir": str(tmp_path)})
+                srv.handle_init(2, {"dataDir": str(tmp_path)})
+
+            assert srv.model.caption_image.call_count == 2
+            assert not (tmp_path / ".neurofind" / "caption_fingerprint.json").exists()
+        finally:
+            srv_mod.send = original_send
+
     def test_handle_init_errors_do_not_block_ready(self, tmp_path):
         """AC5: exceptions in summary or captioning don't prevent ready."""
         from server import Server